@@ -1,19 +1,31 @@
-import os
-import google.generativeai as genai
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from metrics import metrics
+from llm_backends import create_backend
+from conversation_memory import clip_to_tokens
+from profile_rag import FIELD_PROMPT_TOKENS
 
 # Load environment variables
 load_dotenv()
 
+# Returned (or streamed) in place of an answer when the model call fails
+ERROR_RESPONSE = "Error generating response."
+
 class AIEngine:
-    def __init__(self, profile_data=None):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-flash-latest')
-        self.chat = self.model.start_chat(history=[])
+    """
+    Interview persona on top of a pluggable LLM backend (see llm_backends.py).
+    The backend defaults to LLM_BACKEND (Gemini unless set otherwise).
+    With a retriever (profile_rag.ProfileRetriever), long profile fields are only
+    summarized in the system prompt and the relevant excerpts are added per question.
+    With a screen_context (screen_context.ScreenContext), the OCR'd on-screen text
+    goes with each question.
+    """
+    def __init__(self, profile_data=None, backend=None, retriever=None, screen_context=None):
+        self.backend = backend or create_backend()
+        self.retriever = retriever
+        self.screen_context = screen_context
         
         # Build Context from Profile
         intro_context = ""
@@ -23,6 +35,10 @@ class AIEngine:
             company = profile_data.get('company', '')
             skills = profile_data.get('skills', '')
             projects = profile_data.get('projects', '')
+            if retriever:
+                # The full text is in the retrieval index; keep the prompt (and its cost) bounded
+                intro = clip_to_tokens(intro, FIELD_PROMPT_TOKENS, keep="start")
+                projects = clip_to_tokens(projects, FIELD_PROMPT_TOKENS, keep="start")
             
             intro_context = f"""
             **YOUR PERSONA (The User):**
@@ -35,6 +51,11 @@ class AIEngine:
             **INSTRUCTION**: You are acting AS this person. Use this background to answer questions. 
             For example, if asked about a project, refer to the 'Key Projects' listed above.
             """
+            if retriever:
+                intro_context += """
+            Questions may come with "Relevant background from your documents": excerpts from your
+            resume and notes. Prefer those details (names, numbers, tools) when they apply.
+            """
 
         # System prompt / Context setup
         self.system_prompt = f"""
@@ -58,33 +79,188 @@ class AIEngine:
         - If the transcript is unclear, return None.
         """
 
-    def generate_response(self, text_input, image_input=None):
+        # The system prompt is built once and handed to the backend, not re-sent with every prompt
+        self.backend.set_system_prompt(self.system_prompt)
+
+    @property
+    def model_label(self):
+        """'backend/model', recorded with every transcript entry."""
+        return f"{self.backend.name}/{self.backend.model_name}"
+
+    def close(self):
+        self.backend.close()
+
+    def token_report(self):
+        return self.backend.token_report()
+
+    def _build_prompt(self, text_input, history=None):
+        # Only the new turn (plus bounded history, see ConversationMemory, the top-k
+        # profile excerpts and the screen text) is sent; the system prompt lives in the backend
+        prompt = f"Context/Transcript: {text_input}" if text_input else ""
+        if self.screen_context and text_input:
+            screen = self.screen_context.text()
+            if screen:
+                prompt = f"Text currently on screen (OCR):\n{screen}\n\n{prompt}"
+        if self.retriever and text_input:
+            with metrics.span("profile_retrieval"):
+                background = self.retriever.context(text_input)
+            if background:
+                prompt = f"{background}\n\n{prompt}"
+        return f"{history}\n\n{prompt}" if history else prompt
+
+    def generate_response(self, text_input, image_input=None, history=None):
         """
-        Generate a response from Gemini based on text and optional image.
+        Generate a response based on text and optional image.
+        `history` is the rendered earlier conversation (ConversationMemory.context()).
         """
         if not text_input and not image_input:
             return None
 
-        prompt_parts = [self.system_prompt]
-        
-        if image_input:
-            prompt_parts.append(image_input)
-        
-        if text_input:
-            prompt_parts.append(f"Context/Transcript: {text_input}")
-            
         try:
-            # We use generate_content for single turn or chat.send_message for history.
-            # For a "copilot" that sees a stream, maintaining full history might get too long or confused by partial transcripts.
-            # A sliding window or just sending the latest context + query is often better for latency and relevance.
-            # Let's try stateless first for simplicity and speed, or use chat if we want it to remember previous turns.
-            # Given the "real-time" nature, stateless with a sliding window of context is usually safer to avoid getting stuck in a bad state.
-            
-            response = self.model.generate_content(prompt_parts)
-            return response.text
+            with metrics.span(f"{self.backend.name}_request"):
+                return self.backend.generate(self._build_prompt(text_input, history), image_input)
         except Exception as e:
-            print(f"Gemini API Error: {e}")
-            return "Error generating response."
+            print(f"LLM error ({self.backend.name}): {e}")
+            return ERROR_RESPONSE
+
+    def generate_response_stream(self, text_input, image_input=None, cancel_event=None, history=None):
+        """
+        Same as generate_response, but yields text chunks as the model produces them.
+        Time-to-first-token is what the user feels in a live conversation.
+        Setting cancel_event (a threading.Event) abandons the stream at the next chunk.
+        """
+        if not text_input and not image_input:
+            return
+        if cancel_event is not None and cancel_event.is_set():
+            return
+
+        name = self.backend.name
+        produced = False
+        start = time.perf_counter()
+        try:
+            for text in self.backend.generate_stream(self._build_prompt(text_input, history), image_input, cancel_event):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                if not produced:
+                    metrics.record(f"{name}_first_token", start)
+                produced = True
+                yield text
+            if cancel_event is not None and cancel_event.is_set():
+                metrics.record(f"{name}_cancelled", start)
+            else:
+                metrics.record(f"{name}_stream_total", start)
+        except Exception as e:
+            print(f"LLM error ({name}): {e}")
+            if not produced:
+                yield ERROR_RESPONSE
 
     def update_system_prompt(self, new_prompt):
         self.system_prompt = new_prompt
+        self.backend.set_system_prompt(new_prompt)
+
+
+class LLMExecutor:
+    """
+    Future-based front end for an engine's generate_response_stream.
+
+    submit() returns a Future that resolves to the full answer. At most max_in_flight
+    engine requests run at once (more are queued); requests started outside the
+    pool (speculative answers) take a slot with reserve() and count against the
+    same limit. A new submission supersedes the older ones: queued requests are
+    cancelled, running ones get their cancel_event set, and a generation counter
+    makes sure their chunks never reach on_chunk again. A superseded request's
+    future resolves to None.
+    """
+    def __init__(self, engine, max_in_flight=2):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm")
+        # One per engine request running, pooled or reserved
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.active = {}  # generation -> (future, cancel_event)
+        self.superseded = 0
+
+    def submit(self, text_input, image_input=None, on_chunk=None, stream=None, cancel_event=None, history=None):
+        """
+        Start answering and return a Future. on_chunk(chunk, first) is called for each
+        chunk while this is still the newest request. `stream` replaces the engine call
+        (e.g. an answer already in flight), with `cancel_event` to stop it.
+        """
+        cancel_event = cancel_event or threading.Event()
+        with self.lock:
+            superseded = self._supersede()
+            self.generation += 1
+            generation = self.generation
+            future = self.executor.submit(self._run, generation, text_input, image_input,
+                                          on_chunk, stream, cancel_event, history)
+            self.active[generation] = (future, cancel_event)
+        self._cancel(superseded)
+        future.add_done_callback(lambda f: self._forget(generation))
+        return future
+
+    def reserve(self):
+        """Take an engine slot without waiting; False if all are busy. Give it back with release()."""
+        return self.slots.acquire(blocking=False)
+
+    def release(self):
+        self.slots.release()
+
+    def cancel_all(self):
+        """Supersede everything in flight without starting anything new."""
+        with self.lock:
+            superseded = self._supersede()
+            self.generation += 1
+        self._cancel(superseded)
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.active)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    def _supersede(self):
+        """Signal every active request to stop; returns their futures (call with the lock held)."""
+        futures = []
+        for future, cancel_event in self.active.values():
+            if not cancel_event.is_set():
+                cancel_event.set()
+                futures.append(future)
+                self.superseded += 1
+        return futures
+
+    def _cancel(self, futures):
+        # Outside the lock: cancelling a queued future runs its done callbacks right here
+        for future in futures:
+            future.cancel()
+
+    def _forget(self, generation):
+        with self.lock:
+            self.active.pop(generation, None)
+
+    def _run(self, generation, text_input, image_input, on_chunk, stream, cancel_event, history):
+        if stream is not None:
+            # Relaying a request that already holds its own slot
+            return self._deliver(generation, stream, on_chunk, cancel_event)
+        with self.slots:
+            stream = self.engine.generate_response_stream(text_input, image_input, cancel_event=cancel_event,
+                                                          history=history)
+            return self._deliver(generation, stream, on_chunk, cancel_event)
+
+    def _deliver(self, generation, stream, on_chunk, cancel_event):
+        chunks = []
+        for chunk in stream:
+            # Delivered under the lock so a superseded request can't slip a chunk in after the check
+            with self.lock:
+                if generation != self.generation:
+                    cancel_event.set()
+                    return None
+                chunks.append(chunk)
+                if on_chunk:
+                    on_chunk(chunk, len(chunks) == 1)
+        with self.lock:
+            if generation != self.generation:
+                return None
+        return "".join(chunks)
@@ -0,0 +1,203 @@
+"""
+Answer panel for the overlay: a scrollback of questions and streamed answers.
+
+Backed by a QPlainTextEdit document instead of a QLabel:
+
+- Streamed chunks are inserted at the end through a cursor, so only the last
+  paragraph is laid out again (a QLabel re-lays out the whole string on setText).
+- QPlainTextEdit lays out and paints only the visible paragraphs, so repaint time
+  does not grow with the length of the session.
+- A QSyntaxHighlighter formats fenced code blocks (monospace, keywords, strings,
+  comments) and inline markdown while the text streams in.
+- At most `max_answers` Q&A pairs are kept; the oldest are removed from the top.
+  Undo is disabled so removed text is really freed.
+"""
+import os
+import re
+from collections import deque
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextBlockFormat, QTextCharFormat, QTextCursor, QTextFormat
+from PyQt5.QtWidgets import QPlainTextEdit
+
+from metrics import metrics
+
+ANSWER_HISTORY = int(os.getenv("OVERLAY_HISTORY", "100"))  # Q&A pairs kept in the scrollback
+FLUSH_INTERVAL_MS = 16  # streamed chunks are inserted at most once per frame
+
+# Marks question paragraphs so the highlighter leaves them alone
+ROLE_PROPERTY = QTextFormat.UserProperty + 1
+CODE_STATE = 1
+
+CODE_FONT = "Consolas"
+KEYWORDS = {
+    "def", "class", "return", "if", "elif", "else", "for", "while", "try", "except", "finally", "with", "as",
+    "import", "from", "in", "not", "and", "or", "is", "None", "True", "False", "lambda", "yield", "async",
+    "await", "pass", "break", "continue", "raise", "self", "function", "const", "let", "var", "new", "public",
+    "private", "protected", "static", "void", "int", "float", "bool", "string", "null", "true", "false", "this",
+    "interface", "extends", "implements", "struct", "fn", "func", "go", "package", "switch", "case",
+    "SELECT", "FROM", "WHERE", "JOIN", "GROUP", "BY", "ORDER", "INSERT", "UPDATE", "DELETE", "INTO", "VALUES",
+}
+CODE_PATTERNS = (
+    ("keyword", re.compile(r"\b(?:" + "|".join(sorted(KEYWORDS)) + r")\b")),
+    ("number", re.compile(r"\b\d+(?:\.\d+)?\b")),
+    ("string", re.compile(r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'")),
+    ("comment", re.compile(r"(?:^|(?<=\s))(?:#|//|--\s).*$")),
+)
+PROSE_PATTERNS = (
+    ("bold", re.compile(r"\*\*[^*]+\*\*")),
+    ("heading", re.compile(r"^#{1,6}\s.*$")),
+    ("inline_code", re.compile(r"`[^`]+`")),
+)
+
+
+def _char_format(color, bold=False, fixed=False, background=None):
+    fmt = QTextCharFormat()
+    fmt.setForeground(QColor(color))
+    if bold:
+        fmt.setFontWeight(QFont.Bold)
+    if fixed:
+        fmt.setFontFamily(CODE_FONT)
+        fmt.setFontFixedPitch(True)
+    if background:
+        fmt.setBackground(background)
+    return fmt
+
+
+class AnswerHighlighter(QSyntaxHighlighter):
+    """Fenced code blocks and inline markdown; paragraphs are re-highlighted as they change."""
+    def __init__(self, document):
+        super().__init__(document)
+        code_background = QColor(255, 255, 255, 18)
+        self.code = _char_format("#dcdcdc", fixed=True, background=code_background)
+        self.fence = _char_format("#777777", fixed=True)
+        self.formats = {
+            "keyword": _char_format("#569cd6", bold=True, fixed=True, background=code_background),
+            "number": _char_format("#b5cea8", fixed=True, background=code_background),
+            "string": _char_format("#ce9178", fixed=True, background=code_background),
+            "comment": _char_format("#6a9955", fixed=True, background=code_background),
+            "bold": _char_format("#ffffff", bold=True),
+            "heading": _char_format("#ffffff", bold=True),
+            "inline_code": _char_format("#ffd580", fixed=True),
+        }
+
+    def highlightBlock(self, text):
+        if self.currentBlock().blockFormat().property(ROLE_PROPERTY) == "question":
+            # A new question closes any code block the previous answer left open
+            self.setCurrentBlockState(0)
+            return
+        in_code = self.previousBlockState() == CODE_STATE
+        if text.lstrip().startswith("```"):
+            self.setFormat(0, len(text), self.fence)
+            self.setCurrentBlockState(0 if in_code else CODE_STATE)
+            return
+        self.setCurrentBlockState(CODE_STATE if in_code else 0)
+        if in_code:
+            self.setFormat(0, len(text), self.code)
+            patterns = CODE_PATTERNS
+        else:
+            patterns = PROSE_PATTERNS
+        for name, pattern in patterns:
+            for match in pattern.finditer(text):
+                self.setFormat(match.start(), match.end() - match.start(), self.formats[name])
+
+
+class AnswerView(QPlainTextEdit):
+    """
+    Read-only scrollback of Q&A pairs. start_answer() opens a new pair, append()
+    streams into it. The view stays on the current question until the user scrolls.
+    """
+    def __init__(self, max_answers=ANSWER_HISTORY, parent=None):
+        super().__init__(parent)
+        self.max_answers = max_answers
+        self.setReadOnly(True)
+        self.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.document().setUndoRedoEnabled(False)
+        self.highlighter = AnswerHighlighter(self.document())
+
+        self.question_block = QTextBlockFormat()
+        self.question_block.setProperty(ROLE_PROPERTY, "question")
+        self.answer_block = QTextBlockFormat()
+        self.answer_block.setProperty(ROLE_PROPERTY, "answer")
+        self.question_format = _char_format("#ffcc66", bold=True)
+        self.answer_format = _char_format("#00ffff")
+
+        # One cursor at the start of each Q&A; Qt keeps them in place as text is removed above
+        self.entries = deque()
+        self.cursor = QTextCursor(self.document())
+        self.pending = []
+        # Keep the current question at the top until the user scrolls
+        self.pinned = False
+        self.verticalScrollBar().actionTriggered.connect(self._unpin)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def start_answer(self, question, text=""):
+        """Open a new Q&A pair at the end of the scrollback."""
+        self.flush()
+        with metrics.span("ui_repaint", chars=len(text)):
+            self.cursor.movePosition(QTextCursor.End)
+            first_block = self.question_block if question else self.answer_block
+            if self.document().isEmpty():
+                self.cursor.setBlockFormat(first_block)
+            else:
+                # Blank line between pairs
+                self.cursor.insertBlock(self.answer_block)
+                self.cursor.insertBlock(first_block)
+            start = QTextCursor(self.cursor)
+            start.setKeepPositionOnInsert(True)
+            if question:
+                self.cursor.insertText(f"Q: {question}", self.question_format)
+                self.cursor.insertBlock(self.answer_block)
+            self.entries.append(start)
+            self._trim()
+            if text:
+                self.cursor.insertText(text, self.answer_format)
+        self.pinned = True
+        self._scroll()
+
+    def append(self, text):
+        """Stream text into the current answer; inserted on the next frame."""
+        if not self.entries:
+            self.start_answer("")
+        self.pending.append(text)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        self.flush_timer.stop()
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending = []
+        with metrics.span("ui_repaint", chars=len(text)):
+            self.cursor.movePosition(QTextCursor.End)
+            self.cursor.insertText(text, self.answer_format)
+        self._scroll()
+
+    def _trim(self):
+        """Drop the oldest Q&A pairs beyond max_answers."""
+        while len(self.entries) > self.max_answers:
+            self.entries.popleft()
+            oldest = QTextCursor(self.document())
+            oldest.setPosition(self.entries[0].position(), QTextCursor.KeepAnchor)
+            oldest.removeSelectedText()
+
+    def _unpin(self, action):
+        self.pinned = False
+
+    def _scroll(self):
+        if self.pinned and self.entries:
+            # QPlainTextEdit scrolls by line: put the current question's first line at the top
+            self.verticalScrollBar().setValue(self.entries[-1].block().firstLineNumber())
+
+    def clear_history(self):
+        self.pending = []
+        self.entries.clear()
+        self.clear()
+        self.cursor = QTextCursor(self.document())
@@ -3,6 +3,7 @@ import os
 import keyboard
 import threading
 import time
+from contextlib import nullcontext
 from PyQt5.QtWidgets import QApplication
 from pystray import Icon, MenuItem, Menu
 from PIL import Image, ImageDraw
@@ -11,6 +12,15 @@ from audio_capture import AudioCapture
 from ai_engine import AIEngine
 from overlay_ui import OverlayWindow
 from screen_capture import ScreenCapture
+from screen_context import ScreenContext
+from conversation_memory import ConversationMemory, CONTEXT_TOKENS
+from pipeline import Pipeline
+from profile_rag import ProfileRetriever
+from question_detector import QuestionDetector
+from response_cache import ResponseCache
+from search_index import SearchIndex
+from transcript_sink import TranscriptSink
+from metrics import trace_latencies
 
 def create_tray_icon(app_exit_callback):
     # Create a simple icon
@@ -32,8 +42,11 @@ class AppController(QObject):
     update_text_signal = pyqtSignal(str)
     update_status_signal = pyqtSignal(str)
     update_suggestion_signal = pyqtSignal(str)
+    append_suggestion_signal = pyqtSignal(str)
+    update_question_signal = pyqtSignal(str)
 
-    def __init__(self, stt_engine, profile_data=None, profile_filename=None, app_instance=None):
+    def __init__(self, stt_engine, profile_data=None, profile_filename=None, app_instance=None, streaming=True,
+                 profiler=None):
         super().__init__()
         print("Initializing AppController...")
         
@@ -44,58 +57,114 @@ class AppController(QObject):
             self.app = QApplication(sys.argv)
             
         print("PyQt App created.")
-        self.window = OverlayWindow()
+        phase = profiler.phase if profiler else (lambda name: nullcontext())
+        with phase("Qt overlay window creation"):
+            self.window = OverlayWindow()
         print("Overlay Window created.")
         
         # Connect signals
         self.update_text_signal.connect(self.window.update_text)
         self.update_status_signal.connect(self.window.update_status)
         self.update_suggestion_signal.connect(self.window.update_suggestion)
+        self.append_suggestion_signal.connect(self.window.append_suggestion)
+        self.update_question_signal.connect(self.window.update_question)
         
-        self.audio_capture = AudioCapture()
+        # Loopback (the interviewer) plus, unless disabled, the microphone (you) for context
+        self.audio_capture = AudioCapture(partial_interval=0.5 if streaming else None,
+                                          microphone=os.getenv("CAPTURE_MICROPHONE", "1") == "1")
         print("Audio Capture initialized.")
         
+        # Either an STTEngine or a Future resolving to one (loaded in the background)
         self.stt_engine = stt_engine
         print("STT Engine assigned.")
         
         self.profile_data = profile_data
         self.profile_filename = profile_filename
         
-        self.ai_engine = AIEngine(profile_data) # Pass profile to AI Engine
+        # Attached documents / long profile fields are retrieved per question, not sent whole
+        with phase("profile document index"):
+            try:
+                retriever = ProfileRetriever.from_profile(profile_data, profile_filename)
+            except Exception as e:
+                print(f"Profile documents unavailable: {e}")
+                retriever = None
+        # On-screen text (OCR of changed regions only) goes with each question
+        self.screen_context = None
+        if os.getenv("SCREEN_CONTEXT", "1") == "1":
+            try:
+                self.screen_context = ScreenContext(interval=float(os.getenv("SCREEN_INTERVAL", "1.0")))
+            except Exception as e:
+                print(f"Screen context disabled: {e}")
+        with phase("LLM backend setup"):
+            self.ai_engine = AIEngine(profile_data, retriever=retriever,
+                                      screen_context=self.screen_context) # Pass profile to AI Engine
         print("AI Engine initialized.")
         self.screen_capture = ScreenCapture()
         print("Screen Capture initialized.")
         
-        self.running = True
-        self.transcript = ""
-        self.last_ai_time = 0
-        self.clear_transcript_next = False
+        # Capture -> STT -> LLM stages; UI updates come back through Qt signals
+        self.pipeline = Pipeline(
+            self.audio_capture, self.stt_engine, self.ai_engine,
+            streaming=streaming,
+            on_text=self.update_text_signal.emit,
+            on_status=self.update_status_signal.emit,
+            on_suggestion=self.update_suggestion_signal.emit,
+            on_suggestion_chunk=self.append_suggestion_signal.emit,
+            on_question=self.update_question_signal.emit,
+            on_answer=self.save_transcript_pair,
+            answer_cache=ResponseCache(profile_data, profile_filename),
+            refresh_cached=os.getenv("REFRESH_CACHED_ANSWERS", "0") == "1",
+            speculative=os.getenv("SPECULATIVE_ANSWERS", "1") == "1",
+            question_detector=QuestionDetector(debounce=float(os.getenv("QUESTION_DEBOUNCE", "0"))),
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "2")),
+            memory=ConversationMemory(context_tokens=int(os.getenv("MEMORY_TOKENS", str(CONTEXT_TOKENS)))),
+        )
         
         # Ensure transcript directory exists
         self.transcript_dir = os.path.join(os.getcwd(), "transcripts")
         if not os.path.exists(self.transcript_dir):
             os.makedirs(self.transcript_dir)
 
-    def save_transcript_pair(self, question, answer):
-        if not self.profile_filename:
-            print("No profile filename, skipping transcript save.")
-            return
-            
-        # Filename: [ProfileName]_[Date]_transcript.txt
-        base_name = self.profile_filename.replace(".json", "")
-        transcript_file = f"{base_name}_transcript.txt"
-        filepath = os.path.join(self.transcript_dir, transcript_file)
-        
-        timestamp = time.strftime("%H:%M:%S")
-        
+        # Past sessions stay searchable (python search_index.py "query"); new Q&As are
+        # indexed by the sink thread as they are written
         try:
-            print(f"Saving transcript to: {filepath}")
-            with open(filepath, "a", encoding="utf-8") as f:
-                f.write(f"[{timestamp}] Q: {question}\n")
-                f.write(f"[{timestamp}] A: {answer}\n")
-                f.write("-" * 40 + "\n")
+            self.search_index = SearchIndex()
         except Exception as e:
-            print(f"Failed to save transcript: {e}")
+            print(f"Transcript search index disabled: {e}")
+            self.search_index = None
+
+        # Q&A records are written as JSONL in the background; the .txt is appended on exit
+        self.transcript_sink = None
+        if self.profile_filename:
+            # Filename: [ProfileName]_[Date]_transcript.jsonl / .txt
+            base_name = self.profile_filename.replace(".json", "")
+            self.transcript_sink = TranscriptSink(
+                os.path.join(self.transcript_dir, f"{base_name}_transcript.jsonl"),
+                txt_path=os.path.join(self.transcript_dir, f"{base_name}_transcript.txt"),
+                on_flush=self.search_index.index_file if self.search_index else None,
+            )
+
+    def save_transcript_pair(self, question, answer, traces=None):
+        if not self.transcript_sink:
+            print("No profile filename, skipping transcript save.")
+            return
+
+        traces = traces or []
+        spans = [trace_latencies(trace) for trace in traces]
+        last = spans[-1] if spans else {}
+        cached = any(trace.get("cached") for trace in traces)
+        self.transcript_sink.write({
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "question": question,
+            "answer": answer,
+            "model": "cache" if cached else self.ai_engine.model_label,
+            "audio_s": sum(trace.get("duration") or 0 for trace in traces),
+            "stt_s": sum(s.get("stt_decode", 0) for s in spans),
+            "llm_first_token_s": last.get("llm_first_token"),
+            "llm_total_s": last.get("llm_total"),
+            "speech_end_to_answer_s": last.get("speech_end_to_answer"),
+            "speculative": any(trace.get("speculative") for trace in traces),
+        })
 
     def start(self):
         self.window.show()
@@ -107,10 +176,10 @@ class AppController(QObject):
         except Exception as e:
             print(f"Failed to register hotkey: {e}")
         
-        # Start processing thread
-        self.thread = threading.Thread(target=self.process_loop)
-        self.thread.daemon = True
-        self.thread.start()
+        # Start capture, STT and LLM workers
+        self.pipeline.start()
+        if self.screen_context:
+            self.screen_context.start()
         
         # Start Tray Icon
         self.tray_icon = create_tray_icon(self.quit_app)
@@ -127,56 +196,16 @@ class AppController(QObject):
             self.window.show()
 
     def quit_app(self):
-        self.running = False
+        self.pipeline.stop()
+        # Stops the STT worker process, if Whisper runs in one (STT_WORKER=1)
+        if hasattr(self.pipeline.stt_engine, "close"):
+            self.pipeline.stt_engine.close()
+        if self.screen_context:
+            self.screen_context.stop()
+        if self.transcript_sink:
+            self.transcript_sink.close()
+        if self.search_index:
+            self.search_index.close()
+        print(self.ai_engine.token_report())
+        self.ai_engine.close()
         self.app.quit()
-
-    def process_loop(self):
-        self.audio_capture.start()
-        print("Listening...")
-        
-        while self.running:
-            try:
-                # 1. Audio
-                audio_chunk = self.audio_capture.get_audio_chunk()
-                if audio_chunk is not None:
-                    # 2. STT
-                    text = self.stt_engine.transcribe(audio_chunk)
-                    if text:
-                        # Clear previous transcript if AI has responded
-                        if self.clear_transcript_next:
-                            self.transcript = ""
-                            self.clear_transcript_next = False
-                            
-                        print(f"Transcribed: {text}")
-                        self.transcript += " " + text
-                        
-                        # Update UI via Signal
-                        self.update_text_signal.emit(self.transcript[-300:])
-                        
-                        # 3. AI Trigger
-                        current_time = time.time()
-                        if "?" in text or (current_time - self.last_ai_time > 5 and len(text) > 10):
-                            print("Querying Gemini...")
-                            try:
-                                self.update_status_signal.emit("Thinking...")
-                                response = self.ai_engine.generate_response(self.transcript[-1000:])
-                                if response:
-                                    self.update_suggestion_signal.emit(response)
-                                    self.save_transcript_pair(self.transcript[-1000:], response) # Save to file
-                                    
-                                    # Clear transcript immediately to focus on next question
-                                    self.transcript = ""
-                                    self.update_text_signal.emit("") 
-                                    self.clear_transcript_next = False 
-                                    
-                                self.update_status_signal.emit("Active")
-                            except:
-                                pass
-                            self.last_ai_time = current_time
-                
-                time.sleep(0.05)
-            except Exception as e:
-                print(f"Error in loop: {e}")
-                time.sleep(1)
-
-        self.audio_capture.stop()
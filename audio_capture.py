@@ -1,9 +1,19 @@
-import soundcard as sc
-import numpy as np
+try:
+    import soundcard as sc
+except Exception:
+    # No audio backend (e.g. headless Linux); file-backed sources still work
+    sc = None
+import collections
+import json
+import os
 import threading
 import time
 import queue
 
+from audio_io import ArrayRecorder, load_wav
+from ring_buffer import AudioRingBuffer
+from vad import create_vad, UtteranceSegmenter, SPEECH_START, SPEECH_END
+
 import warnings
 # Suppress soundcard runtime warnings (data discontinuity)
 warnings.filterwarnings("ignore", category=UserWarning, module='soundcard')
@@ -16,110 +26,306 @@ try:
 except ImportError:
     pass
 
+# Audio history kept in the ring buffer. Must comfortably exceed the 30 s max phrase,
+# since queued phrases are views into it rather than copies.
+RING_SECONDS = 120
+
+# Phrase sources: the other side of the call (speaker loopback) and the user (microphone)
+REMOTE = "remote"
+LOCAL = "local"
+
+# Loopback / microphone chosen for each default speaker, so startup skips the device scan
+DEVICE_CACHE = os.path.join("cache", "audio_devices.json")
+# A microphone phrase mostly covered by remote speech is the speakers' echo (or crosstalk), not the user
+ECHO_OVERLAP = 0.8
+# How fast a source's clock anchor may move forward per frame (absorbs device clock drift)
+ANCHOR_SLEW = 0.0005
+
+_devices = None
+
+
+def _device_id(device):
+    return getattr(device, "id", None) or device.name
+
+
+def _scan_loopback(default_speaker):
+    """Loopback device of the default speaker (name-matching heuristic), or any loopback."""
+    mics = sc.all_microphones(include_loopback=True)
+    for mic in mics:
+        if mic.isloopback and (default_speaker.name in mic.name or mic.name in default_speaker.name):
+            return mic
+    for mic in mics:
+        if mic.isloopback:
+            return mic
+    return None
+
+
+def find_devices(refresh=False):
+    """
+    (loopback, microphone) for the default speaker and default microphone.
+    The loopback matched to a speaker is remembered in DEVICE_CACHE and in-process,
+    and only re-scanned when the default speaker changes (or refresh=True).
+    """
+    global _devices
+    if sc is None:
+        print("Error: soundcard is unavailable (no audio backend)! Audio capture will fail.")
+        return None, None
+
+    default_speaker = sc.default_speaker()
+    speaker_id = _device_id(default_speaker)
+    if _devices and not refresh and _devices[0] == speaker_id:
+        return _devices[1], _devices[2]
+
+    cache = {}
+    if not refresh and os.path.exists(DEVICE_CACHE):
+        try:
+            with open(DEVICE_CACHE, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable device cache: {e}")
+
+    loopback = None
+    if cache.get("speaker_id") == speaker_id and cache.get("loopback_id"):
+        try:
+            loopback = sc.get_microphone(cache["loopback_id"], include_loopback=True)
+        except Exception:
+            loopback = None
+    if loopback is None:
+        loopback = _scan_loopback(default_speaker)
+        if loopback is not None:
+            try:
+                os.makedirs(os.path.dirname(DEVICE_CACHE), exist_ok=True)
+                with open(DEVICE_CACHE, "w", encoding="utf-8") as f:
+                    json.dump({"speaker_id": speaker_id, "speaker": default_speaker.name,
+                               "loopback_id": _device_id(loopback), "loopback": loopback.name}, f, indent=4)
+            except Exception as e:
+                print(f"Failed to save device cache: {e}")
+
+    try:
+        microphone = sc.default_microphone()
+    except Exception:
+        microphone = None
+    _devices = (speaker_id, loopback, microphone)
+    return loopback, microphone
+
+
 class AudioCapture:
-    def __init__(self, sample_rate=16000):
+    """
+    Records the speaker loopback (REMOTE) and, with microphone=True, the default
+    microphone (LOCAL) on parallel threads. Each source has its own ring buffer and
+    VAD; their phrases share one queue, tagged with the source and time-aligned on
+    the perf_counter clock (t_start / t_end), so echo of the remote side picked up
+    by the microphone can be recognised and dropped. Partial snapshots (streaming
+    transcription) are only published for the remote side.
+    """
+    def __init__(self, sample_rate=16000, partial_interval=0.5, max_pending=16, vad="energy", microphone=False):
         self.sample_rate = sample_rate
-        self.audio_queue = queue.Queue()
+        self.rings = {REMOTE: AudioRingBuffer(RING_SECONDS * sample_rate)}
+        if microphone:
+            self.rings[LOCAL] = AudioRingBuffer(RING_SECONDS * sample_rate)
+        self.ring = self.rings[REMOTE]
+        self.microphone = microphone
+        # "energy" (adaptive noise floor) or "silero" (faster-whisper's bundled model)
+        self.vad_name = vad
+        self.segmenters = {}
+        # Per source: perf_counter time of sample 0, and when its current utterance started
+        self.anchors = {}
+        self.speaking_since = {}
+        self.remote_spans = collections.deque(maxlen=32)
+        # Seconds between partial snapshots of the phrase being spoken (None disables streaming)
+        self.partial_interval = partial_interval
+        # Bounded so a stalled consumer can't grow memory forever; oldest phrases are dropped
+        self.audio_queue = queue.Queue(maxsize=max_pending)
+        # Only the newest partial snapshot is useful, older ones are dropped
+        self.partial_queue = queue.Queue(maxsize=1)
+        # Set whenever a phrase or partial snapshot is queued, so consumers can block instead of polling
+        self.audio_ready = threading.Event()
         self.is_recording = False
         self.thread = None
+        self.mic_thread = None
+        self.block_when_full = False
+        # Time sources by sample position alone (files replayed faster than real time)
+        self.sample_clock = False
+        self.last_chunk_info = {}
+
+    @property
+    def segmenter(self):
+        return self.segmenters.get(REMOTE)
 
     def _record_loop(self):
         """Background loop to record audio using soundcard with VAD."""
-        print("Finding loopback device...")
+        print("Finding audio devices...")
         try:
-            # Find loopback mic
-            mics = sc.all_microphones(include_loopback=True)
-            default_speaker = sc.default_speaker()
-            loopback_mic = None
-            
-            # Heuristic to find the loopback for default speaker
-            for mic in mics:
-                if mic.isloopback and (default_speaker.name in mic.name or mic.name in default_speaker.name):
-                    loopback_mic = mic
-                    break
-            
-            # Fallback
-            if not loopback_mic:
-                for mic in mics:
-                    if mic.isloopback:
-                        loopback_mic = mic
-                        break
-            
+            loopback_mic, microphone = find_devices()
+            if self.microphone:
+                if microphone:
+                    self._start_source_thread(LOCAL, self._record_device, microphone)
+                else:
+                    print("No microphone found, capturing the remote side only.")
             if not loopback_mic:
                 print("Error: No loopback device found! Audio capture will fail.")
                 return
-
-            print(f"Recording from: {loopback_mic.name}")
-            
-            # VAD Parameters
-            FRAME_DURATION = 0.1  # seconds
-            SILENCE_THRESHOLD = 0.03 # RMS amplitude (Increased to filter noise)
-            SILENCE_DURATION = 1.5 # seconds of silence to trigger processing
-            MAX_DURATION = 30.0 # seconds max before forcing processing
-            
-            buffer = []
-            silence_start_time = None
-            has_speech = False
-            
-            with loopback_mic.recorder(samplerate=self.sample_rate) as recorder:
-                while self.is_recording:
-                    # Record small chunks
-                    num_frames = int(self.sample_rate * FRAME_DURATION)
-                    data = recorder.record(numframes=num_frames)
-                    
-                    # Convert to mono
-                    if data.shape[1] > 1:
-                        data = data.mean(axis=1)
-                    
-                    data = data.flatten().astype(np.float32)
-                    
-                    # Calculate RMS amplitude
-                    rms = np.sqrt(np.mean(data**2))
-                    
-                    if rms > SILENCE_THRESHOLD:
-                        # Speech detected
-                        if not has_speech:
-                            print("Speech started...")
-                            has_speech = True
-                        silence_start_time = None
-                        buffer.append(data)
-                    else:
-                        # Silence detected
-                        if has_speech:
-                            buffer.append(data) # Keep trailing silence for natural cut
-                            
-                            if silence_start_time is None:
-                                silence_start_time = time.time()
-                            
-                            # Check if silence has lasted long enough
-                            if time.time() - silence_start_time > SILENCE_DURATION:
-                                print("Silence detected, processing phrase...")
-                                # Concatenate buffer
-                                full_audio = np.concatenate(buffer)
-                                self.audio_queue.put(full_audio)
-                                
-                                # Reset
-                                buffer = []
-                                has_speech = False
-                                silence_start_time = None
-                        else:
-                            # Just silence, ignore
-                            pass
-                            
-                    # Force flush if too long
-                    if len(buffer) * num_frames / self.sample_rate > MAX_DURATION:
-                         print("Max duration reached, forcing process...")
-                         full_audio = np.concatenate(buffer)
-                         self.audio_queue.put(full_audio)
-                         buffer = []
-                         has_speech = False
-                         silence_start_time = None
-                    
+            self._record_device(REMOTE, loopback_mic)
         except Exception as e:
             print(f"Error in audio recording loop: {e}")
             import traceback
             traceback.print_exc()
 
+    def _start_source_thread(self, source, target, *args):
+        self.mic_thread = threading.Thread(target=target, args=(source,) + args, name=f"capture-{source}")
+        self.mic_thread.daemon = True
+        self.mic_thread.start()
+
+    def _record_device(self, source, device):
+        try:
+            print(f"Recording {source} audio from: {device.name}")
+            with device.recorder(samplerate=self.sample_rate) as recorder:
+                self._capture(recorder, source)
+        except Exception as e:
+            print(f"Error recording {source} audio: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _capture(self, recorder, source=REMOTE):
+        """Run iter_phrases on `recorder` and queue what it yields."""
+        for kind, start, end in self.iter_phrases(recorder, source):
+            if kind == "phrase":
+                self._publish_phrase(start, end, self.segmenters[source].last_trailing_silence, source)
+            else:
+                self._publish_partial(start, end)
+
+    def time_of(self, source, pos):
+        """perf_counter time at which sample `pos` of `source` was captured."""
+        return self.anchors.get(source, 0.0) + pos / self.sample_rate
+
+    def _align(self, source, frame_end):
+        if self.sample_clock:
+            return
+        # Blocks arrive after a varying delay; the earliest arrival is the closest to capture time
+        anchor = time.perf_counter() - frame_end / self.sample_rate
+        previous = self.anchors.get(source)
+        self.anchors[source] = anchor if previous is None else min(anchor, previous + ANCHOR_SLEW)
+
+    def iter_phrases(self, recorder, source=REMOTE):
+        """
+        Core capture loop, shared by live recording and offline replay/benchmarks.
+        Reads 100 ms frames from `recorder` (anything with record(numframes)), runs the VAD
+        and yields ("partial", start, end) and ("phrase", start, end) spans of self.rings[source].
+        Stops when is_recording is cleared or the recorder returns an empty block.
+        """
+        # VAD Parameters
+        FRAME_DURATION = 0.1  # seconds
+        MAX_DURATION = 30.0 # seconds max before forcing processing
+
+        ring = self.rings[source]
+        num_frames = int(self.sample_rate * FRAME_DURATION)
+        vad = create_vad(self.vad_name, sample_rate=self.sample_rate, frame_duration=FRAME_DURATION)
+        segmenter = self.segmenters[source] = UtteranceSegmenter(frame_duration=FRAME_DURATION,
+                                                                 max_duration=MAX_DURATION)
+        label = "" if source == REMOTE else f"[{source}] "
+
+        # Frames before onset to keep as lead-in, so the first syllable isn't clipped
+        pre_roll_samples = (segmenter.min_speech_frames + 1) * num_frames
+        utterance_start = None
+        last_end = 0
+        frames_since_partial = 0
+        # Only the remote side is transcribed while it is being spoken
+        partial_frames = int(self.partial_interval / FRAME_DURATION) if self.partial_interval and source == REMOTE else 0
+
+        while self.is_recording:
+            # Record small chunks
+            data = recorder.record(numframes=num_frames)
+            if data is None or len(data) == 0:
+                # Source exhausted: flush the phrase in progress
+                if segmenter.in_speech:
+                    segmenter.last_trailing_silence = segmenter.silence_run * FRAME_DURATION
+                    self.speaking_since[source] = None
+                    yield "phrase", utterance_start, ring.write_pos
+                return
+            
+            # Convert to mono once, straight into the ring buffer
+            frame_end = ring.write_downmix(data)
+            self._align(source, frame_end)
+            frame = ring.view(frame_end - len(data), frame_end)
+
+            is_speech = vad.classify(frame)[0]
+            event = segmenter.update(is_speech)
+
+            if event == SPEECH_START:
+                print(f"{label}Speech started...")
+                utterance_start = max(last_end, frame_end - pre_roll_samples)
+                self.speaking_since[source] = self.time_of(source, utterance_start)
+            elif event == SPEECH_END:
+                # Phrase includes trailing silence for natural cut
+                if segmenter.forced:
+                    print(f"{label}Max duration reached, forcing process...")
+                else:
+                    print(f"{label}Silence detected, processing phrase...")
+                self.speaking_since[source] = None
+                yield "phrase", utterance_start, frame_end
+                utterance_start = None
+                last_end = frame_end
+
+            # Publish a snapshot of the phrase so far for streaming transcription
+            if segmenter.in_speech and partial_frames:
+                frames_since_partial += 1
+                if frames_since_partial >= partial_frames:
+                    frames_since_partial = 0
+                    yield "partial", utterance_start, frame_end
+            else:
+                frames_since_partial = 0
+
+    def _is_echo(self, t_start, t_end):
+        """True if remote speech covers most of [t_start, t_end] (the microphone heard the speakers)."""
+        spans = list(self.remote_spans)
+        since = self.speaking_since.get(REMOTE)
+        if since is not None:
+            spans.append((since, self.time_of(REMOTE, self.rings[REMOTE].write_pos)))
+        covered = sum(max(0.0, min(t_end, end) - max(t_start, start)) for start, end in spans)
+        return t_end > t_start and covered >= ECHO_OVERLAP * (t_end - t_start)
+
+    def _publish_phrase(self, start, end, trailing_silence=0.0, source=REMOTE):
+        now = time.perf_counter()
+        t_start, t_end = self.time_of(source, start), self.time_of(source, end)
+        if source == REMOTE:
+            self._clear_partial()
+            self.remote_spans.append((t_start, t_end))
+        elif self._is_echo(t_start, t_end - trailing_silence):
+            print(f"Dropping {source} phrase: it overlaps remote speech (echo).")
+            return
+        # Timing info travels with the phrase for per-utterance latency traces
+        info = {"queued": now, "speech_end": now - trailing_silence, "duration": (end - start) / self.sample_rate,
+                "source": source, "t_start": t_start, "t_end": t_end}
+        while True:
+            try:
+                if self.block_when_full:
+                    # File sources can wait for the consumer instead of dropping audio
+                    self.audio_queue.put((start, end, info))
+                else:
+                    self.audio_queue.put_nowait((start, end, info))
+                break
+            except queue.Full:
+                print("Audio queue full, dropping oldest phrase.")
+                try:
+                    self.audio_queue.get_nowait()
+                except queue.Empty:
+                    pass
+        self.audio_ready.set()
+
+    def _publish_partial(self, start, end):
+        self._clear_partial()
+        try:
+            self.partial_queue.put_nowait((start, end))
+        except queue.Full:
+            pass
+        self.audio_ready.set()
+
+    def _clear_partial(self):
+        try:
+            self.partial_queue.get_nowait()
+        except queue.Empty:
+            pass
+
     def start(self):
         """Start capturing audio."""
         if self.is_recording:
@@ -134,13 +340,96 @@ class AudioCapture:
     def stop(self):
         """Stop audio capture."""
         self.is_recording = False
-        if self.thread:
-            self.thread.join(timeout=1.0)
-            self.thread = None
+        # Wake up any consumer blocked in wait()
+        self.audio_ready.set()
+        for thread in (self.thread, self.mic_thread):
+            if thread:
+                thread.join(timeout=1.0)
+        self.thread = None
+        self.mic_thread = None
+
+    def wait(self, timeout=None):
+        """Block until a phrase or partial snapshot is available (or timeout). Returns True if woken."""
+        woken = self.audio_ready.wait(timeout)
+        # Clear before the caller drains the queues so no wake-up is lost
+        self.audio_ready.clear()
+        return woken
+
+    def _span_view(self, span, source=REMOTE):
+        start, end = span[0], span[1]
+        ring = self.rings[source]
+        if not ring.is_valid(start):
+            print("Consumer fell too far behind, phrase was overwritten.")
+            return None
+        return ring.view(start, end)
+
+    def get_audio_chunk(self, timeout=None):
+        """
+        Retrieve a phrase from the queue, waiting up to timeout seconds if given.
+        Returns a zero-copy float32 view into the ring buffer; it stays valid for
+        RING_SECONDS of further recording. Timing info for the returned phrase
+        (source, queued / speech_end / t_start / t_end perf_counter stamps, duration)
+        is left in last_chunk_info.
+        """
+        try:
+            if timeout:
+                span = self.audio_queue.get(timeout=timeout)
+            else:
+                span = self.audio_queue.get_nowait()
+        except queue.Empty:
+            return None
+        self.last_chunk_info = span[2]
+        return self._span_view(span, span[2]["source"])
 
-    def get_audio_chunk(self):
-        """Retrieve a chunk of audio from the queue."""
+    def get_partial_chunk(self):
+        """Retrieve the latest snapshot of the phrase still being spoken, if any."""
         try:
-            return self.audio_queue.get_nowait()
+            span = self.partial_queue.get_nowait()
         except queue.Empty:
             return None
+        return self._span_view(span)
+
+
+class FileAudioCapture(AudioCapture):
+    """
+    AudioCapture fed from WAV files instead of the loopback device.
+    Same start/stop/get_audio_chunk interface, so the whole pipeline can run headless.
+    realtime=True paces the audio like a live device; False feeds it as fast as the
+    consumer keeps up (the capture blocks instead of dropping phrases).
+    mic_paths, if given, are replayed as the microphone side in parallel (they
+    should start at the same moment as `paths` to stay time-aligned).
+    """
+    def __init__(self, paths, realtime=True, sample_rate=16000, mic_paths=None, **kwargs):
+        if not realtime:
+            # Running ahead of the consumer must not overwrite queued phrases in the ring
+            kwargs.setdefault("max_pending", 2)
+        super().__init__(sample_rate=sample_rate, microphone=bool(mic_paths), **kwargs)
+        self.paths = list(paths)
+        self.mic_paths = list(mic_paths or [])
+        self.realtime = realtime
+        self.block_when_full = not realtime
+        self.sample_clock = not realtime
+        self.finished = threading.Event()
+
+    def _replay(self, source, paths):
+        for path in paths:
+            if not self.is_recording:
+                break
+            print(f"Replaying {source} audio: {path}")
+            self._capture(ArrayRecorder(load_wav(path, self.sample_rate), self.sample_rate, realtime=self.realtime),
+                          source)
+
+    def _record_loop(self):
+        try:
+            if self.mic_paths:
+                self._start_source_thread(LOCAL, self._replay, self.mic_paths)
+            self._replay(REMOTE, self.paths)
+            if self.mic_thread:
+                self.mic_thread.join()
+        except Exception as e:
+            print(f"Error in file replay loop: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.finished.set()
+            self.audio_ready.set()
@@ -0,0 +1,62 @@
+import time
+import wave
+import numpy as np
+
+def load_wav(path, sample_rate=16000):
+    """
+    Load a PCM WAV file as float32 mono in [-1, 1], resampled to sample_rate.
+    Only needs the standard library and numpy (scipy for resampling), no sound device.
+    """
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width * 8} bit")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+
+    if rate != sample_rate:
+        from math import gcd
+        from scipy.signal import resample_poly
+        g = gcd(rate, sample_rate)
+        audio = resample_poly(audio, sample_rate // g, rate // g).astype(np.float32)
+
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+
+class ArrayRecorder:
+    """
+    Stand-in for a soundcard recorder that plays back a numpy array.
+    record() returns (numframes, 1) blocks and an empty block once the audio is exhausted.
+    With realtime=True it paces itself like a live device.
+    """
+    def __init__(self, audio, sample_rate=16000, realtime=False):
+        self.audio = audio.reshape(-1, 1) if audio.ndim == 1 else audio
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.pos = 0
+        self.started = None
+
+    def record(self, numframes):
+        if self.realtime:
+            if self.started is None:
+                self.started = time.perf_counter()
+            # Sleep until this block would have been captured by a real device
+            due = self.started + (self.pos + numframes) / self.sample_rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        block = self.audio[self.pos:self.pos + numframes]
+        self.pos += len(block)
+        return block
@@ -0,0 +1,139 @@
+"""
+Screenshot payload benchmark: encode time and bytes per frame for the image
+preparation stage (image_prep.py) against a full-resolution lossless baseline.
+
+Frames are synthetic screens (editor-style text on a dark background plus UI blocks)
+at common monitor sizes, stored as raw BGRA like mss returns them, or real
+screenshots given on the command line. For each frame and each format the benchmark
+times decoding from the BGRA buffer, downsampling and encoding, and reports the
+payload size. A repeated frame measures the dedupe path.
+
+Usage:
+    python benchmarks/image_benchmark.py [screenshot.png ...] [--sizes 1920x1080 3840x2160]
+                                         [--formats webp jpeg] [--max-side 1536] [--repeat 5] [--json out.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_prep import IMAGE_MAX_BYTES, IMAGE_MAX_SIDE, ImagePrep, downsample, encode, image_from_bgra
+
+WORDS = ("def class return self import for while if else try except print lambda yield async await "
+         "kubernetes deployment service pod replica config value None True False list dict").split()
+
+
+def synthetic_screen(width, height, seed=0):
+    """Editor-like screen: text lines in a few colours, a sidebar and a title bar."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 0, width, 40], fill=(60, 60, 60))
+    draw.rectangle([0, 40, width // 6, height], fill=(45, 45, 48))
+    colours = [(212, 212, 212), (86, 156, 214), (206, 145, 120), (106, 153, 85)]
+    line_height = max(14, height // 60)
+    for y in range(50, height - line_height, line_height):
+        x = width // 6 + 20 + rng.randint(0, 4) * 16
+        for _ in range(rng.randint(2, 10)):
+            word = rng.choice(WORDS)
+            draw.text((x, y), word, fill=rng.choice(colours))
+            x += 8 * len(word) + 8
+    return image
+
+
+def to_bgra(image):
+    """RGB PIL image -> (bytes, size) in mss's BGRA layout."""
+    rgb = np.asarray(image)
+    bgra = np.empty(rgb.shape[:2] + (4,), dtype=np.uint8)
+    bgra[..., 0], bgra[..., 1], bgra[..., 2], bgra[..., 3] = rgb[..., 2], rgb[..., 1], rgb[..., 0], 255
+    return bytearray(bgra.tobytes()), image.size
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, float(np.median(times))
+
+
+def bench_frame(name, buffer, size, formats, max_side, max_bytes, repeat):
+    rows = []
+    # Baseline: whole frame converted to RGB and encoded losslessly at full resolution
+    def baseline():
+        image = Image.frombytes("RGB", size, bytes(buffer), "raw", "BGRX")
+        out = io.BytesIO()
+        image.save(out, format="PNG", compress_level=1)
+        return out.tell()
+    baseline_bytes, baseline_s = timed(baseline, max(1, repeat // 2))
+    rows.append({"frame": name, "format": "png-full", "size": list(size), "bytes": baseline_bytes,
+                 "decode_ms": None, "resize_ms": None, "encode_ms": baseline_s * 1000, "total_ms": baseline_s * 1000})
+
+    for fmt in formats:
+        image, decode_s = timed(lambda: image_from_bgra(buffer, size), repeat)
+        small, resize_s = timed(lambda: downsample(image, max_side), repeat)
+        (data, used_fmt, quality, out_size), encode_s = timed(lambda: encode(small, max_bytes, fmt), repeat)
+        prep = ImagePrep(max_side=max_side, max_bytes=max_bytes, fmt=fmt)
+        prep.prepare_bgra(buffer, size)
+        _, dedupe_s = timed(lambda: prep.prepare_bgra(buffer, size), repeat)
+        rows.append({"frame": name, "format": used_fmt, "quality": quality, "size": list(out_size),
+                     "bytes": len(data), "decode_ms": decode_s * 1000, "resize_ms": resize_s * 1000,
+                     "encode_ms": encode_s * 1000, "total_ms": (decode_s + resize_s + encode_s) * 1000,
+                     "dedupe_ms": dedupe_s * 1000})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark screenshot payload preparation.")
+    parser.add_argument("images", nargs="*", help="Real screenshots to use instead of synthetic screens")
+    parser.add_argument("--sizes", nargs="+", default=["1920x1080", "2560x1440", "3840x2160"])
+    parser.add_argument("--formats", nargs="+", choices=["webp", "jpeg"], default=["webp", "jpeg"])
+    parser.add_argument("--max-side", type=int, default=IMAGE_MAX_SIDE)
+    parser.add_argument("--max-bytes", type=int, default=IMAGE_MAX_BYTES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    frames = []
+    for path in args.images:
+        frames.append((os.path.basename(path),) + to_bgra(Image.open(path).convert("RGB")))
+    if not args.images:
+        for spec in args.sizes:
+            width, height = (int(v) for v in spec.split("x"))
+            frames.append((spec,) + to_bgra(synthetic_screen(width, height)))
+
+    results = []
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+    print(f"{'frame':<14s} {'format':<9s} {'out size':<11s} {'KB':>8s} {'decode':>8s} {'resize':>8s} "
+          f"{'encode':>8s} {'total':>8s} {'dedupe':>8s}  (ms)")
+    for name, buffer, size in frames:
+        for r in bench_frame(name, buffer, size, args.formats, args.max_side, args.max_bytes, args.repeat):
+            results.append(r)
+            print(f"{r['frame']:<14s} {r['format']:<9s} {'x'.join(map(str, r['size'])):<11s} "
+                  f"{r['bytes'] / 1024:8.0f} {fmt(r['decode_ms']):>8s} {fmt(r['resize_ms']):>8s} "
+                  f"{fmt(r['encode_ms']):>8s} {fmt(r['total_ms']):>8s} {fmt(r.get('dedupe_ms')):>8s}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+                "max_side": args.max_side,
+                "max_bytes": args.max_bytes,
+                "results": results,
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
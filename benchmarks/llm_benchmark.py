@@ -0,0 +1,124 @@
+"""
+LLM backend benchmark: load time, time to first token, total answer latency and
+output throughput per backend (see llm_backends.py).
+
+Prompts are the questions labelled in benchmarks/fixtures/questions.jsonl, sent
+through AIEngine exactly like the pipeline does (persona system prompt, streaming).
+The gemini backend needs GEMINI_API_KEY; local needs llama-cpp-python and a GGUF
+model in LOCAL_LLM_MODEL. The stub backend is a sanity check of the harness itself.
+
+Usage:
+    python benchmarks/llm_benchmark.py [--backends stub local gemini] [--profile profiles/me.json]
+                                       [--limit 10] [--json out.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_engine import AIEngine, ERROR_RESPONSE
+from llm_backends import BACKENDS, create_backend
+
+
+def load_questions(path, limit):
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                phrase = json.loads(line)
+                if phrase["question"]:
+                    questions.append(phrase["text"])
+    return questions[:limit]
+
+
+def run_backend(name, profile_data, questions):
+    load_start = time.perf_counter()
+    engine = AIEngine(profile_data, backend=create_backend(name))
+    load_time = time.perf_counter() - load_start
+
+    first_tokens, totals, rates = [], [], []
+    errors = 0
+    for question in questions:
+        start = time.perf_counter()
+        first = None
+        chunks = []
+        for chunk in engine.generate_response_stream(question):
+            if first is None:
+                first = time.perf_counter() - start
+            chunks.append(chunk)
+        total = time.perf_counter() - start
+        answer = "".join(chunks)
+        if not answer or answer == ERROR_RESPONSE:
+            errors += 1
+            continue
+        first_tokens.append(first)
+        totals.append(total)
+        # Words per second after the first token: comparable across tokenizers
+        if total > first:
+            rates.append(len(answer.split()) / (total - first))
+    report = engine.token_report()
+    engine.close()
+
+    pct = lambda values, p: float(np.percentile(values, p)) if values else None
+    return {
+        "backend": name,
+        "load_s": load_time,
+        "requests": len(questions),
+        "errors": errors,
+        "first_token_p50_s": pct(first_tokens, 50),
+        "first_token_p95_s": pct(first_tokens, 95),
+        "total_p50_s": pct(totals, 50),
+        "total_p95_s": pct(totals, 95),
+        "words_per_s": float(np.mean(rates)) if rates else None,
+        "token_report": report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LLM backends on latency and throughput.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["stub", "local", "gemini"])
+    parser.add_argument("--questions", default=os.path.join(ROOT, "benchmarks", "fixtures", "questions.jsonl"))
+    parser.add_argument("--profile", help="Profile JSON for the persona system prompt")
+    parser.add_argument("--limit", type=int, default=10, help="Number of questions per backend")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    profile_data = None
+    if args.profile:
+        with open(args.profile, "r", encoding="utf-8") as f:
+            profile_data = json.load(f)
+    questions = load_questions(args.questions, args.limit)
+
+    results = {}
+    fmt = lambda v: "n/a" if v is None else f"{v:.2f}"
+    for name in args.backends:
+        print(f"Benchmarking backend: {name} ({len(questions)} questions)...")
+        try:
+            r = results[name] = run_backend(name, profile_data, questions)
+        except Exception as e:
+            print(f"  unavailable: {e}")
+            results[name] = {"backend": name, "error": str(e)}
+            continue
+        print(f"  load={fmt(r['load_s'])}s ttft p50={fmt(r['first_token_p50_s'])}s p95={fmt(r['first_token_p95_s'])}s "
+              f"total p50={fmt(r['total_p50_s'])}s p95={fmt(r['total_p95_s'])}s "
+              f"throughput={fmt(r['words_per_s'])} words/s errors={r['errors']}")
+        print(f"  {r['token_report']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+                "results": results,
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+STT benchmark: real-time factor, per-chunk latency, peak RSS and WER per decoding profile.
+
+Fixtures are 16 kHz WAV clips with a sidecar JSON holding the reference transcript
+(see benchmarks/fixtures/README.md). Every clip is cut into phrases by the same
+AudioCapture loop the app uses, and each phrase is decoded with STTEngine.transcribe.
+
+Each profile runs in its own subprocess so peak RSS is measured per model.
+Runs offline on a CPU-only box: no sound device is needed.
+
+Usage:
+    python benchmarks/stt_benchmark.py [fixtures_dir] [--profiles fast balanced] [--json out.json]
+    python benchmarks/stt_benchmark.py --compare baseline.json out.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_RATE = 16000
+
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def edit_distance(ref, hyp):
+    """Word-level Levenshtein distance."""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    except ImportError:
+        return None
+
+
+def load_fixtures(fixtures_dir):
+    fixtures = []
+    for wav in sorted(glob.glob(os.path.join(fixtures_dir, "*.wav"))):
+        label_path = os.path.splitext(wav)[0] + ".json"
+        if not os.path.exists(label_path):
+            print(f"Skipping {wav}: no {os.path.basename(label_path)}", file=sys.stderr)
+            continue
+        with open(label_path, "r", encoding="utf-8") as f:
+            label = json.load(f)
+        if "text" not in label:
+            print(f"Skipping {wav}: no reference 'text'", file=sys.stderr)
+            continue
+        fixtures.append((wav, label["text"]))
+    return fixtures
+
+
+def run_profile(profile, fixtures_dir):
+    """Benchmark one profile in this process and return its result dict."""
+    from audio_capture import AudioCapture
+    from audio_io import ArrayRecorder, load_wav
+    from stt_engine import STTEngine
+
+    load_start = time.perf_counter()
+    engine = STTEngine(profile=profile)
+    engine.warm_up()
+    load_time = time.perf_counter() - load_start
+
+    latencies = []
+    audio_seconds = 0.0
+    errors = 0
+    ref_words = 0
+    files = []
+    for wav, reference in load_fixtures(fixtures_dir):
+        audio = load_wav(wav, SAMPLE_RATE)
+        capture = AudioCapture(sample_rate=SAMPLE_RATE, partial_interval=None)
+        capture.is_recording = True
+
+        texts = []
+        for kind, start, end in capture.iter_phrases(ArrayRecorder(audio, SAMPLE_RATE)):
+            chunk = capture.ring.view(start, end)
+            t0 = time.perf_counter()
+            text = engine.transcribe(chunk)
+            latencies.append(time.perf_counter() - t0)
+            if text:
+                texts.append(text)
+
+        hypothesis = " ".join(texts)
+        ref = normalize_words(reference)
+        dist = edit_distance(ref, normalize_words(hypothesis))
+        errors += dist
+        ref_words += len(ref)
+        audio_seconds += len(audio) / SAMPLE_RATE
+        files.append({"file": os.path.basename(wav), "wer": dist / len(ref) if ref else None, "hypothesis": hypothesis})
+
+    decode_seconds = sum(latencies)
+    return {
+        "profile": profile,
+        "settings": dict(engine.profile),
+        "load_and_warmup_s": load_time,
+        "chunks": len(latencies),
+        "audio_s": audio_seconds,
+        "rtf": decode_seconds / audio_seconds if audio_seconds else None,
+        "latency_p50_s": float(np.percentile(latencies, 50)) if latencies else None,
+        "latency_p95_s": float(np.percentile(latencies, 95)) if latencies else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "wer": errors / ref_words if ref_words else None,
+        "files": files,
+    }
+
+
+def run_isolated(profile, fixtures_dir):
+    """Run one profile in a fresh interpreter so peak RSS isn't shared between models."""
+    cmd = [sys.executable, os.path.abspath(__file__), fixtures_dir, "--single", profile]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+        return {"profile": profile, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    # Result is the last stdout line; engine logging comes before it
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(baseline_path, current_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = json.load(f)["results"]
+    print(f"{'profile':10s} {'metric':14s} {'baseline':>10s} {'current':>10s} {'delta':>9s}")
+    for profile, cur in current.items():
+        base = baseline.get(profile)
+        if not base:
+            continue
+        for metric in ("rtf", "latency_p50_s", "latency_p95_s", "peak_rss_mb", "wer"):
+            b, c = base.get(metric), cur.get(metric)
+            if b is None or c is None:
+                continue
+            delta = f"{(c - b) / b * 100:+8.1f}%" if b else "      n/a"
+            print(f"{profile:10s} {metric:14s} {b:10.3f} {c:10.3f} {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark STT speed and accuracy per decoding profile.")
+    parser.add_argument("fixtures", nargs="?", default=os.path.join(ROOT, "benchmarks", "fixtures"))
+    parser.add_argument("--profiles", nargs="+", default=["fastest", "fast", "balanced", "accurate"])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.single:
+        print(json.dumps(run_profile(args.single, args.fixtures)))
+        return
+
+    if not load_fixtures(args.fixtures):
+        print(f"No labelled WAV fixtures found in {args.fixtures}")
+        return
+
+    results = {}
+    for profile in args.profiles:
+        print(f"Benchmarking profile: {profile}...")
+        r = results[profile] = run_isolated(profile, args.fixtures)
+        if "error" in r:
+            print(f"  failed: {r['error']}")
+            continue
+        fmt = lambda v: "n/a" if v is None else f"{v:.3f}"
+        print(f"  rtf={fmt(r['rtf'])} p50={fmt(r['latency_p50_s'])}s p95={fmt(r['latency_p95_s'])}s "
+              f"rss={fmt(r['peak_rss_mb'])}MB wer={fmt(r['wer'])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "machine": {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count()},
+                "results": results,
+            }, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Question-trigger benchmark: precision, recall and API calls of the question detector
+against the legacy trigger ("?" in the phrase, or 5 s since the last answer and more
+than 10 characters).
+
+Fixtures are JSON lines of transcribed phrases in session order:
+
+    {"session": "backend_01", "t": 50.1, "text": "What's the difference between a process", "question": false}
+    {"session": "backend_01", "t": 52.0, "text": "and a thread?", "question": true}
+
+`t` is when the phrase was transcribed (seconds), `question` whether an answer is
+expected right after it. Phrases are fed exactly like Pipeline.handle_text does,
+with detector polls every 0.5 s in between like the STT worker.
+
+Usage:
+    python benchmarks/trigger_benchmark.py [questions.jsonl] [--debounce 0 0.5] [--threshold 0.5]
+                                           [--errors] [--json out.json]
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_detector import QuestionDetector
+
+POLL_INTERVAL = 0.5
+
+
+def load_sessions(path):
+    sessions = collections.OrderedDict()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                phrase = json.loads(line)
+                sessions.setdefault(phrase.get("session", ""), []).append(phrase)
+    return sessions
+
+
+def run_legacy(phrases):
+    """Fire times per phrase index under the old trigger rule."""
+    fired = {}
+    last_ai_time = 0
+    for i, phrase in enumerate(phrases):
+        if "?" in phrase["text"] or (phrase["t"] - last_ai_time > 5 and len(phrase["text"]) > 10):
+            fired[i] = phrase["t"]
+            last_ai_time = phrase["t"]
+    return fired
+
+
+def run_detector(phrases, threshold, debounce):
+    """Fire times per phrase index; a fire from poll() belongs to the last phrase fed."""
+    detector = QuestionDetector(threshold=threshold, debounce=debounce)
+    fired = {}
+    for i, phrase in enumerate(phrases):
+        if detector.feed(phrase["text"], now=phrase["t"]):
+            fired[i] = phrase["t"]
+        next_t = phrases[i + 1]["t"] if i + 1 < len(phrases) else phrase["t"] + 60
+        t = phrase["t"] + POLL_INTERVAL
+        while detector.holding and t < next_t:
+            if detector.poll(now=t):
+                fired[i] = t
+            t += POLL_INTERVAL
+    return fired
+
+
+def score(sessions, run):
+    tp = fp = fn = calls = 0
+    delays = []
+    errors = []
+    for name, phrases in sessions.items():
+        fired = run(phrases)
+        calls += len(fired)
+        for i, phrase in enumerate(phrases):
+            predicted = i in fired
+            if predicted and phrase["question"]:
+                tp += 1
+                delays.append(fired[i] - phrase["t"])
+            elif predicted:
+                fp += 1
+                errors.append(("false trigger", name, phrase["text"]))
+            elif phrase["question"]:
+                fn += 1
+                errors.append(("missed", name, phrase["text"]))
+    return {
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None,
+        "api_calls": calls,
+        "false_triggers": fp,
+        "missed": fn,
+        "mean_delay_s": sum(delays) / len(delays) if delays else None,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure question-trigger precision, recall and API calls.")
+    parser.add_argument("fixtures", nargs="?", default=os.path.join(ROOT, "benchmarks", "fixtures", "questions.jsonl"))
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--debounce", type=float, nargs="+", default=[0.0, 0.5, 1.0])
+    parser.add_argument("--errors", action="store_true", help="List false triggers and missed questions")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.fixtures)
+    labelled = sum(len(p) for p in sessions.values())
+    questions = sum(p["question"] for phrases in sessions.values() for p in phrases)
+    print(f"{labelled} phrases in {len(sessions)} sessions, {questions} expect an answer.\n")
+
+    results = {"legacy": score(sessions, run_legacy)}
+    for debounce in args.debounce:
+        results[f"detector_debounce_{debounce:g}s"] = score(
+            sessions, lambda phrases: run_detector(phrases, args.threshold, debounce))
+
+    legacy_calls = results["legacy"]["api_calls"]
+    fmt = lambda v, spec: "n/a" if v is None else format(v, spec)
+    print(f"{'trigger':26s} {'precision':>9s} {'recall':>7s} {'calls':>6s} {'saved':>7s} {'delay':>7s}")
+    for name, r in results.items():
+        saved = (legacy_calls - r["api_calls"]) / legacy_calls * 100 if legacy_calls else 0
+        r["api_calls_saved_pct"] = saved
+        print(f"{name:26s} {fmt(r['precision'], '9.2f')} {fmt(r['recall'], '7.2f')} {r['api_calls']:6d} "
+              f"{saved:6.0f}% {fmt(r['mean_delay_s'], '6.2f')}s")
+
+    if args.errors:
+        for name, r in results.items():
+            if r["errors"]:
+                print(f"\n{name}:")
+            for kind, session, text in r["errors"]:
+                print(f"  {kind:13s} [{session}] {text}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"fixtures": args.fixtures, "threshold": args.threshold, "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+VAD benchmark over recorded WAV fixtures.
+
+Each fixture is a WAV file plus a sidecar JSON with the reference speech segments:
+
+    benchmarks/fixtures/interview_01.wav
+    benchmarks/fixtures/interview_01.json   {"speech": [[0.8, 4.2], [6.0, 9.7]]}
+
+Audio is fed frame by frame exactly like AudioCapture does, and for every VAD we report:
+  - end-of-speech latency: detected utterance end minus reference speech end
+  - false triggers: detected utterances that overlap no reference speech
+  - missed: reference segments no detected utterance overlaps
+
+Usage:
+    python benchmarks/vad_benchmark.py [fixtures_dir] [--vad energy silero] [--json out.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_io import load_wav
+from vad import create_vad, split_frames, EnergyVAD, SileroVAD, UtteranceSegmenter, SPEECH_START, SPEECH_END
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 0.1
+
+# Class create_vad() must build for each name; anything else is a fallback
+VAD_CLASSES = {"energy": EnergyVAD, "silero": SileroVAD}
+
+
+def detect_utterances(audio, vad_name):
+    """Run VAD + segmenter frame by frame. Returns [(start, end)] in seconds and the VAD time spent."""
+    vad = create_vad(vad_name, sample_rate=SAMPLE_RATE, frame_duration=FRAME_DURATION)
+    segmenter = UtteranceSegmenter(frame_duration=FRAME_DURATION)
+    frames = split_frames(audio, int(SAMPLE_RATE * FRAME_DURATION))
+
+    utterances = []
+    start = None
+    vad_time = 0.0
+    for i, frame in enumerate(frames):
+        t0 = time.perf_counter()
+        is_speech = vad.classify(frame)[0]
+        vad_time += time.perf_counter() - t0
+
+        event = segmenter.update(is_speech)
+        frame_end = (i + 1) * FRAME_DURATION
+        if event == SPEECH_START:
+            start = frame_end - segmenter.min_speech_frames * FRAME_DURATION
+        elif event == SPEECH_END:
+            utterances.append((start, frame_end))
+            start = None
+    if start is not None:
+        utterances.append((start, len(frames) * FRAME_DURATION))
+    return utterances, vad_time
+
+
+def overlaps(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def score(utterances, reference):
+    latencies = []
+    false_triggers = 0
+    for utt in utterances:
+        matched = [ref for ref in reference if overlaps(utt, ref)]
+        if not matched:
+            false_triggers += 1
+            continue
+        latencies.append(utt[1] - max(ref[1] for ref in matched))
+    missed = sum(1 for ref in reference if not any(overlaps(utt, ref) for utt in utterances))
+    return latencies, false_triggers, missed
+
+
+def run(fixtures_dir, vad_names):
+    wavs = sorted(glob.glob(os.path.join(fixtures_dir, "*.wav")))
+    if not wavs:
+        print(f"No WAV fixtures found in {fixtures_dir}")
+        return {}
+
+    results = {}
+    for vad_name in vad_names:
+        # create_vad() falls back to the energy VAD when Silero can't load; that row would compare energy with itself
+        built = type(create_vad(vad_name, sample_rate=SAMPLE_RATE, frame_duration=FRAME_DURATION))
+        if VAD_CLASSES.get(vad_name) is not built:
+            print(f"Skipping '{vad_name}': create_vad built {built.__name__} instead")
+            continue
+        latencies = []
+        false_triggers = 0
+        missed = 0
+        audio_seconds = 0.0
+        vad_seconds = 0.0
+        for wav in wavs:
+            label_path = os.path.splitext(wav)[0] + ".json"
+            if not os.path.exists(label_path):
+                print(f"Skipping {wav}: no {os.path.basename(label_path)}")
+                continue
+            with open(label_path, "r", encoding="utf-8") as f:
+                reference = [tuple(seg) for seg in json.load(f)["speech"]]
+
+            audio = load_wav(wav, SAMPLE_RATE)
+            utterances, vad_time = detect_utterances(audio, vad_name)
+            lat, ft, ms = score(utterances, reference)
+            latencies.extend(lat)
+            false_triggers += ft
+            missed += ms
+            audio_seconds += len(audio) / SAMPLE_RATE
+            vad_seconds += vad_time
+
+        results[vad_name] = {
+            "vad_class": built.__name__,
+            "files": len(wavs),
+            "utterances": len(latencies),
+            "eos_latency_mean_s": float(np.mean(latencies)) if latencies else None,
+            "eos_latency_p50_s": float(np.percentile(latencies, 50)) if latencies else None,
+            "eos_latency_p95_s": float(np.percentile(latencies, 95)) if latencies else None,
+            "false_triggers": false_triggers,
+            "missed": missed,
+            "vad_rtf": vad_seconds / audio_seconds if audio_seconds else None,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VAD end-of-speech latency and false triggers.")
+    parser.add_argument("fixtures", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    parser.add_argument("--vad", nargs="+", default=["energy", "silero"])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.fixtures, args.vad)
+    for vad_name, r in results.items():
+        fmt = lambda v: "n/a" if v is None else f"{v:.3f}"
+        print(f"{vad_name:8s} utterances={r['utterances']:4d} "
+              f"eos p50={fmt(r['eos_latency_p50_s'])}s p95={fmt(r['eos_latency_p95_s'])}s "
+              f"false_triggers={r['false_triggers']} missed={r['missed']} rtf={fmt(r['vad_rtf'])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Rolling conversation memory for the LLM prompt.
+
+Every answered question is stored as two structured turns (interviewer, assistant);
+with microphone capture, what the user actually said is stored as candidate turns.
+The newest turns are kept verbatim; once they outgrow their share of the budget the
+oldest ones are folded into a running summary, a few at a time; the newest exchange
+is never folded. context() then renders summary + recent turns within a fixed token
+budget (cutting the newest exchange short if it doesn't fit), so the prompt sent per
+question stays the same size however long the meeting runs, while follow-ups
+("why?", "and in the second project?") still see what they refer to.
+
+Token counts are estimated at ~4 characters per token, like the Gemini backend does.
+"""
+import re
+import threading
+import time
+
+# Budgets in (estimated) tokens
+CONTEXT_TOKENS = 900     # summary + recent turns sent with each question
+SUMMARY_TOKENS = 250     # running summary of everything older
+QUESTION_TOKENS = 300    # the transcript of the current question itself
+
+# Rendered speaker labels
+SPEAKERS = {"interviewer": "Interviewer", "assistant": "You", "candidate": "You (said aloud)"}
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def clip_to_tokens(text, max_tokens, keep="end"):
+    """Trim `text` to about max_tokens at a word boundary, keeping its end (or start)."""
+    text = " ".join(text.split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * 4
+    if keep == "end":
+        clipped = text[-max_chars:]
+        space = clipped.find(" ")
+        return clipped[space + 1:] if 0 <= space < len(clipped) - 1 else clipped
+    clipped = text[:max_chars]
+    space = clipped.rfind(" ")
+    return clipped[:space] if space > 0 else clipped
+
+
+def first_sentence(text, max_words=25):
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    words = sentence.split()
+    return " ".join(words[:max_words]) + ("..." if len(words) > max_words else "")
+
+
+def extractive_summary(summary, turns):
+    """
+    Fold `turns` into `summary`: one line per question with the gist of the answer.
+    Cheap and local, so compaction never waits on the model.
+    """
+    lines = summary.splitlines() if summary else []
+    question = None
+    for turn in turns:
+        if turn["role"] == "interviewer":
+            question = first_sentence(turn["text"], max_words=20)
+        elif turn["role"] == "candidate":
+            lines.append(f"- You said: {first_sentence(turn['text'])}")
+        else:
+            gist = first_sentence(turn["text"])
+            lines.append(f"- Asked: {question}; answered: {gist}" if question else f"- Said: {gist}")
+            question = None
+    if question:
+        lines.append(f"- Asked: {question}")
+    return "\n".join(lines)
+
+
+def newest_exchange_start(turns):
+    """Index where the newest exchange starts: the last interviewer turn (else the last turn)."""
+    for i in range(len(turns) - 1, -1, -1):
+        if turns[i]["role"] == "interviewer":
+            return i
+    return max(len(turns) - 1, 0)
+
+
+class ConversationMemory:
+    """
+    Structured turns + incremental summary, rendered within a token budget.
+    Thread-safe: turns are added from the LLM callbacks and read when asking.
+    """
+    def __init__(self, context_tokens=CONTEXT_TOKENS, summary_tokens=SUMMARY_TOKENS, summarize=extractive_summary):
+        self.context_tokens = context_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.turns = []
+        self.summary = ""
+        self.summarized_turns = 0
+        self.lock = threading.Lock()
+
+    def add_turn(self, role, text):
+        text = " ".join(text.split())
+        if not text:
+            return
+        with self.lock:
+            self.turns.append({"role": role, "text": text, "time": time.time(), "tokens": estimate_tokens(text)})
+            self._compact()
+
+    def add_exchange(self, question, answer):
+        self.add_turn("interviewer", question)
+        self.add_turn("assistant", answer)
+
+    def _compact(self):
+        """Fold the oldest turns into the summary once the verbatim turns outgrow their budget."""
+        recent_budget = self.context_tokens - self.summary_tokens
+        if sum(t["tokens"] for t in self.turns) <= recent_budget:
+            return
+        # Fold down to half the budget so compaction happens in batches, not on every turn.
+        # The newest exchange stays verbatim however long it is; context() cuts it to fit.
+        foldable = newest_exchange_start(self.turns)
+        folded = []
+        while len(folded) < foldable and (len(folded) % 2 or sum(t["tokens"] for t in self.turns) > recent_budget // 2):
+            folded.append(self.turns.pop(0))
+        if not folded:
+            return
+        self.summary = self.summarize(self.summary, folded)
+        self.summarized_turns += len(folded)
+        # Oldest summary lines go first when the summary itself outgrows its budget
+        lines = self.summary.splitlines()
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+
+    def context(self):
+        """Summary and the most recent turns that fit in context_tokens, oldest first."""
+        with self.lock:
+            summary = self.summary
+            turns = list(self.turns)
+        parts = []
+        budget = self.context_tokens
+        if summary:
+            parts.append("Earlier in this interview:\n" + summary)
+            budget -= estimate_tokens(parts[0])
+        lines = [f"{SPEAKERS.get(turn['role'], turn['role'])}: {turn['text']}" for turn in turns]
+        newest = newest_exchange_start(turns)
+        recent = []
+        for i in range(len(lines) - 1, -1, -1):
+            line = lines[i]
+            if estimate_tokens(line) > budget:
+                if i < newest:
+                    break
+                # Always keep (the start of) the newest exchange: follow-ups refer to it.
+                # Leave room for its earlier turns (the question), up to half the budget.
+                reserved = min(sum(estimate_tokens(l) for l in lines[newest:i]), budget // 2)
+                line = clip_to_tokens(line, budget - reserved, keep="start")
+            recent.append(line)
+            budget -= estimate_tokens(line)
+        if recent:
+            parts.append("Recent conversation:\n" + "\n".join(reversed(recent)))
+        return "\n\n".join(parts)
+
+    def stats(self):
+        with self.lock:
+            return {"turns": len(self.turns), "summarized_turns": self.summarized_turns,
+                    "summary_tokens": estimate_tokens(self.summary)}
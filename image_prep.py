@@ -0,0 +1,156 @@
+"""
+Compact image payloads for multimodal prompts.
+
+A full-resolution screenshot (33 MB of pixels on a 4K monitor) is far more than a
+vision model uses: Gemini scales images down and bills them in 768 px tiles. This
+stage turns a capture into a small encoded blob before it reaches the SDK:
+
+1. Decode only the region of interest straight from the mss BGRA buffer
+   (Image.frombuffer with the source row stride, no full-frame RGB copy).
+2. Downsample to at most max_side pixels on the long edge (box reduce, then Lanczos).
+3. Encode as WebP (or JPEG) within max_bytes, stepping quality down, then size.
+4. Skip all of that when the frame is identical to the last one. For raw captures
+   this is checked on a row sample of the BGRA buffer, before any decoding.
+
+The result is a {"mime_type", "data"} blob the Gemini SDK accepts as a content part.
+"""
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+from PIL import Image, features
+
+# Long edge sent to the model: 2x2 of Gemini's 768 px tiles
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1536"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(250 * 1024)))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp")
+QUALITY_STEPS = (80, 65, 50, 35)
+# Below this long edge screen text is unreadable; the budget gives way first
+MIN_SIDE = 768
+# Dedupe hashes every Nth row of a raw capture; any text line is taller than this
+DEDUPE_ROW_STEP = 4
+
+MIME_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def image_from_bgra(buffer, size, roi=None, row_stride=None):
+    """
+    RGB image of roi = (left, top, width, height) decoded directly from a BGRA/BGRX
+    buffer such as mss's ScreenShot.raw. Only the region's pixels are converted.
+    """
+    width, height = size
+    row_stride = row_stride or width * 4
+    left, top, w, h = roi or (0, 0, width, height)
+    left, top = max(0, left), max(0, top)
+    w, h = min(w, width - left), min(h, height - top)
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Region {roi} is outside the {width}x{height} frame")
+    offset = top * row_stride + left * 4
+    view = memoryview(buffer)[offset:offset + (h - 1) * row_stride + w * 4]
+    return Image.frombuffer("RGB", (w, h), view, "raw", "BGRX", row_stride, 1)
+
+
+def frame_digest(buffer, size, roi=None, row_stride=None):
+    """Hash of every DEDUPE_ROW_STEP-th row of roi in a BGRA buffer (a fraction of hashing it all)."""
+    width, height = size
+    row_stride = row_stride or width * 4
+    left, top, w, h = roi or (0, 0, width, height)
+    rows = np.frombuffer(buffer, dtype=np.uint8, count=height * row_stride).reshape(height, row_stride)
+    sample = np.ascontiguousarray(rows[max(0, top):top + h:DEDUPE_ROW_STEP, max(0, left) * 4:(left + w) * 4])
+    return hashlib.blake2b(sample.data, digest_size=16).digest()
+
+
+def downsample(image, max_side=IMAGE_MAX_SIDE):
+    """Fit the long edge into max_side. Integer box reduction first keeps Lanczos cheap."""
+    long_side = max(image.size)
+    if long_side <= max_side:
+        return image
+    factor = long_side // max_side
+    if factor >= 2:
+        image = image.reduce(factor)
+    if max(image.size) > max_side:
+        scale = max_side / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+    return image
+
+
+def encode(image, max_bytes=IMAGE_MAX_BYTES, fmt=IMAGE_FORMAT):
+    """(bytes, format, quality, size) of the best-quality encoding within max_bytes."""
+    if fmt == "webp" and not features.check("webp"):
+        fmt = "jpeg"
+    while True:
+        for quality in QUALITY_STEPS:
+            out = io.BytesIO()
+            if fmt == "webp":
+                # method 2: most of WebP's size advantage at a fraction of the default's encode time
+                image.save(out, format="WEBP", quality=quality, method=2)
+            else:
+                image.save(out, format="JPEG", quality=quality, optimize=False)
+            if out.tell() <= max_bytes:
+                return out.getvalue(), fmt, quality, image.size
+        if max(image.size) * 0.75 < MIN_SIDE:
+            # Over budget even at the lowest quality: send it anyway rather than unreadable
+            return out.getvalue(), fmt, quality, image.size
+        image = image.resize((int(image.width * 0.75), int(image.height * 0.75)), Image.LANCZOS)
+
+
+class ImagePrep:
+    """
+    Capture -> payload with deduplication: an identical downsampled frame reuses the
+    previous encoding instead of being encoded (and uploaded as a new image) again.
+    """
+    def __init__(self, max_side=IMAGE_MAX_SIDE, max_bytes=IMAGE_MAX_BYTES, fmt=IMAGE_FORMAT):
+        self.max_side = max_side
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.last_hash = None
+        self.last_payload = None
+        self.frames = 0
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+    def _reuse(self, digest):
+        """Previous payload if digest matches the last frame, else None."""
+        with self.lock:
+            self.frames += 1
+            if digest == self.last_hash:
+                self.duplicates += 1
+                return self.last_payload
+        return None
+
+    def _encode(self, small, digest):
+        data, fmt, quality, size = encode(small, self.max_bytes, self.fmt)
+        payload = {"mime_type": MIME_TYPES[fmt], "data": data}
+        with self.lock:
+            self.last_hash, self.last_payload = digest, payload
+        return payload
+
+    def prepare(self, image):
+        """{"mime_type", "data"} blob for a PIL image."""
+        small = downsample(image, self.max_side)
+        digest = hashlib.blake2b(small.tobytes(), digest_size=16).digest()
+        return self._reuse(digest) or self._encode(small, digest)
+
+    def prepare_bgra(self, buffer, size, roi=None):
+        """Blob for a raw BGRA capture (mss ScreenShot.raw + .size), decoding only `roi`."""
+        digest = frame_digest(buffer, size, roi)
+        cached = self._reuse(digest)
+        if cached is not None:
+            return cached
+        return self._encode(downsample(image_from_bgra(buffer, size, roi), self.max_side), digest)
+
+
+_default_prep = None
+
+
+def as_payload(image):
+    """Prepared blob for whatever was passed as image_input (PIL image or an existing blob)."""
+    global _default_prep
+    if image is None or isinstance(image, dict):
+        return image
+    if _default_prep is None:
+        _default_prep = ImagePrep()
+    return _default_prep.prepare(image)
@@ -0,0 +1,320 @@
+"""
+LLM backends behind AIEngine.
+
+AIEngine owns the persona (system prompt) and the prompt format; a backend only
+turns (system prompt, prompt, optional screenshot) into text. Every backend
+implements the same small interface:
+
+    set_system_prompt(system_prompt)
+    generate_stream(prompt, image=None, cancel_event=None) -> iterator of text chunks
+    generate(prompt, image=None) -> str
+    token_report() -> str
+    close()
+
+Backends raise on errors; AIEngine turns failures into ERROR_RESPONSE.
+Pick one with LLM_BACKEND=gemini|local|stub (see create_backend).
+"""
+import datetime
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+try:
+    import llama_cpp
+except ImportError:
+    llama_cpp = None
+
+from image_prep import as_payload
+
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+# Explicit context caching needs a pinned model version on some API versions
+GEMINI_CACHE_MODEL = os.getenv("GEMINI_CACHE_MODEL", GEMINI_MODEL)
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=2)
+# The API rejects cached contents below a model-dependent minimum size; smaller
+# system prompts just go in system_instruction (and benefit from implicit caching).
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))
+
+# Quantized GGUF model for the local backend, e.g. a Q4_K_M build of a 1-3B instruct model
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "models/local-llm.Q4_K_M.gguf")
+LOCAL_LLM_CONTEXT = int(os.getenv("LOCAL_LLM_CONTEXT", "4096"))
+LOCAL_LLM_MAX_TOKENS = int(os.getenv("LOCAL_LLM_MAX_TOKENS", "400"))
+
+BACKENDS = ("gemini", "local", "stub")
+
+
+class LLMBackend:
+    """Base class: streaming is the primitive, generate() joins the stream."""
+    name = "llm"
+    model_name = None
+
+    def set_system_prompt(self, system_prompt):
+        self.system_prompt = system_prompt
+
+    def generate_stream(self, prompt, image=None, cancel_event=None):
+        raise NotImplementedError
+
+    def generate(self, prompt, image=None):
+        return "".join(self.generate_stream(prompt, image))
+
+    def token_report(self):
+        return f"{self.name}: no token usage recorded."
+
+    def close(self):
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini. The system prompt goes in system_instruction, or is uploaded
+    once as cached content when it is large enough for the API's context caching.
+    """
+    name = "gemini"
+
+    def __init__(self, model_name=GEMINI_MODEL):
+        if genai is None:
+            raise RuntimeError("google-generativeai is not installed (pip install google-generativeai).")
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables.")
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = None
+        self.cached_content = None
+        self.usage = []
+        self.usage_lock = threading.Lock()
+
+    def set_system_prompt(self, system_prompt):
+        self.system_prompt = system_prompt
+        self._create_model()
+
+    def _create_model(self):
+        self._delete_cached_content()
+        use_cache = os.getenv("GEMINI_CONTEXT_CACHE", "1") == "1"
+        # Rough estimate (~4 chars per token) to avoid a count_tokens round-trip at startup
+        estimated_tokens = len(self.system_prompt) // 4
+        if use_cache and estimated_tokens >= CONTEXT_CACHE_MIN_TOKENS:
+            try:
+                from google.generativeai import caching
+                self.cached_content = caching.CachedContent.create(
+                    model=GEMINI_CACHE_MODEL,
+                    display_name="ai-assistant-profile",
+                    system_instruction=self.system_prompt,
+                    ttl=CONTEXT_CACHE_TTL,
+                )
+                self.model = genai.GenerativeModel.from_cached_content(cached_content=self.cached_content)
+                print(f"System prompt uploaded as cached content (~{estimated_tokens} tokens).")
+                return
+            except Exception as e:
+                print(f"Context caching unavailable, using system_instruction: {e}")
+                self.cached_content = None
+        self.model = genai.GenerativeModel(self.model_name, system_instruction=self.system_prompt)
+
+    def _delete_cached_content(self):
+        if self.cached_content is not None:
+            try:
+                self.cached_content.delete()
+            except Exception as e:
+                print(f"Failed to delete cached content: {e}")
+            self.cached_content = None
+
+    def _fall_back_from_cache(self, error):
+        """Cached content can expire mid-session; rebuild without it. Returns True if a retry makes sense."""
+        if self.cached_content is None:
+            return False
+        print(f"Cached content failed ({error}), falling back to system_instruction.")
+        self.cached_content = None
+        self.model = genai.GenerativeModel(self.model_name, system_instruction=self.system_prompt)
+        return True
+
+    def close(self):
+        self._delete_cached_content()
+
+    def _record_usage(self, response):
+        """Log per-request input tokens and how many of them came from cache."""
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        prompt = getattr(usage, "prompt_token_count", 0) or 0
+        cached = getattr(usage, "cached_content_token_count", 0) or 0
+        output = getattr(usage, "candidates_token_count", 0) or 0
+        with self.usage_lock:
+            self.usage.append((prompt, cached, output))
+        print(f"Tokens: input={prompt} (cached={cached}, new={prompt - cached}) output={output}")
+
+    def token_report(self):
+        """Summary of input tokens per request and the share served from the cached system prompt."""
+        with self.usage_lock:
+            usage = list(self.usage)
+        if not usage:
+            return "No Gemini requests yet."
+        n = len(usage)
+        prompt = sum(u[0] for u in usage)
+        cached = sum(u[1] for u in usage)
+        return (f"{n} requests: avg input {prompt / n:.0f} tokens, avg cached {cached / n:.0f}, "
+                f"avg new {(prompt - cached) / n:.0f} per request "
+                f"({cached / prompt * 100 if prompt else 0:.0f}% of input tokens saved by caching)")
+
+    def _parts(self, prompt, image):
+        # Screenshots go up downsampled and compressed, not as full-resolution pixels
+        parts = [as_payload(image)] if image else []
+        if prompt:
+            parts.append(prompt)
+        return parts
+
+    def generate(self, prompt, image=None):
+        try:
+            response = self.model.generate_content(self._parts(prompt, image))
+        except Exception as e:
+            if self._fall_back_from_cache(e):
+                return self.generate(prompt, image)
+            raise
+        self._record_usage(response)
+        return response.text
+
+    def generate_stream(self, prompt, image=None, cancel_event=None):
+        produced = False
+        try:
+            response = self.model.generate_content(self._parts(prompt, image), stream=True)
+            for chunk in response:
+                if cancel_event is not None and cancel_event.is_set():
+                    # Dropping the iterator closes the HTTP stream
+                    return
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only)
+                    continue
+                if text:
+                    produced = True
+                    yield text
+            self._record_usage(response)
+        except Exception as e:
+            if not produced and self._fall_back_from_cache(e):
+                yield from self.generate_stream(prompt, image, cancel_event)
+                return
+            raise
+
+
+class LlamaCppBackend(LLMBackend):
+    """
+    Local CPU model through llama.cpp (pip install llama-cpp-python): no network
+    round-trip and no API key. Takes a quantized GGUF file (Q4_K_M / Q5_K_M keep a
+    3B model around 2 GB and fast enough on a laptop CPU).
+
+    The system prompt is evaluated once at load; llama.cpp reuses the KV cache for
+    the shared prefix, so each question only pays for its own tokens.
+    Screenshots are ignored (text-only model).
+    """
+    name = "local"
+
+    def __init__(self, model_path=LOCAL_LLM_MODEL, n_ctx=LOCAL_LLM_CONTEXT, n_threads=None,
+                 max_tokens=LOCAL_LLM_MAX_TOKENS, temperature=0.7):
+        if llama_cpp is None:
+            raise RuntimeError("llama-cpp-python is not installed (pip install llama-cpp-python).")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Local model not found: {model_path} (set LOCAL_LLM_MODEL to a .gguf file)")
+        n_threads = n_threads or int(os.getenv("LOCAL_LLM_THREADS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+        start = time.perf_counter()
+        self.model_name = os.path.basename(model_path)
+        self.llm = llama_cpp.Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        print(f"Loaded local model {os.path.basename(model_path)} in {time.perf_counter() - start:.1f}s "
+              f"({n_threads} threads).")
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        # One context: generations are serialized (a superseded one stops at its next token)
+        self.lock = threading.Lock()
+        self.warned_image = False
+        self.requests = 0
+        self.tokens = 0
+        self.generate_seconds = 0.0
+
+    def _messages(self, prompt):
+        return [{"role": "system", "content": self.system_prompt}, {"role": "user", "content": prompt}]
+
+    def set_system_prompt(self, system_prompt):
+        self.system_prompt = system_prompt
+        # Prefill the system prompt now so the first real question doesn't pay for it
+        start = time.perf_counter()
+        with self.lock:
+            self.llm.create_chat_completion(messages=self._messages("Hi"), max_tokens=1)
+        print(f"Local model system prompt prefilled in {time.perf_counter() - start:.1f}s.")
+
+    def generate_stream(self, prompt, image=None, cancel_event=None):
+        if image is not None and not self.warned_image:
+            print("Local model is text-only, ignoring screenshot.")
+            self.warned_image = True
+        with self.lock:
+            start = time.perf_counter()
+            tokens = 0
+            try:
+                for part in self.llm.create_chat_completion(messages=self._messages(prompt), stream=True,
+                                                            max_tokens=self.max_tokens,
+                                                            temperature=self.temperature):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    text = part["choices"][0]["delta"].get("content")
+                    if text:
+                        tokens += 1
+                        yield text
+            finally:
+                self.requests += 1
+                self.tokens += tokens
+                self.generate_seconds += time.perf_counter() - start
+
+    def token_report(self):
+        if not self.requests:
+            return "No local model requests yet."
+        rate = self.tokens / self.generate_seconds if self.generate_seconds else 0
+        return (f"{self.requests} local requests: {self.tokens / self.requests:.0f} tokens per answer, "
+                f"{rate:.1f} tokens/s")
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline stand-in: no network, no model, no API key.
+    Simulates a real model's latency profile (time to first token, then a steady
+    token rate) so end-to-end timings from replay runs stay meaningful.
+    """
+    name = "stub"
+    model_name = "stub"
+
+    def __init__(self, first_token_delay=0.4, tokens_per_second=80):
+        self.first_token_delay = first_token_delay
+        self.tokens_per_second = tokens_per_second
+        self.system_prompt = ""
+
+    def _answer(self, prompt):
+        question = " ".join(prompt.split())[-120:]
+        return (f"Here is how I would answer \"{question}\": "
+                "I would start with the core idea in one sentence, then give a concrete example from my projects.")
+
+    def generate_stream(self, prompt, image=None, cancel_event=None):
+        cancel_event = cancel_event or threading.Event()
+        if cancel_event.wait(self.first_token_delay):
+            return
+        words = self._answer(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i and cancel_event.wait(1.0 / self.tokens_per_second):
+                return
+            yield word if i == 0 else " " + word
+
+
+def create_backend(name=None):
+    """Backend named by `name` or LLM_BACKEND (default gemini)."""
+    name = name or os.getenv("LLM_BACKEND", "gemini")
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "local":
+        return LlamaCppBackend()
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM backend {name!r} (choose from {', '.join(BACKENDS)})")
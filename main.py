@@ -1,17 +1,85 @@
+import os
 import sys
+import atexit
 import threading
 import time
 import queue
-# NOTE: Do NOT import PyQt5 or AppController here to avoid DLL conflicts with faster-whisper
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+_START_TIME = time.perf_counter()
+
+class StartupProfiler:
+    """Per-phase startup timings, printed when run with --startup-profile."""
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.phases = []
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, thread="main"):
+        with self.lock:
+            self.phases.append((name, seconds, thread))
+
+    @contextmanager
+    def phase(self, name, thread="main"):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0, thread)
+
+    def report(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            phases = list(self.phases)
+        print("\n=== Startup profile ===")
+        for name, seconds, thread in phases:
+            print(f"  {name:<32s} {seconds * 1000:9.1f} ms  [{thread}]")
+        print(f"  {'total wall time':<32s} {(time.perf_counter() - _START_TIME) * 1000:9.1f} ms")
+        print("=======================\n")
 
-from audio_capture import AudioCapture
-from stt_engine import STTEngine
-from ai_engine import AIEngine
-from screen_capture import ScreenCapture
+profiler = StartupProfiler("--startup-profile" in sys.argv)
+
+def _arg_value(flag):
+    """Value following `flag` on the command line, if present."""
+    if flag in sys.argv:
+        i = sys.argv.index(flag)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return None
+
+# NOTE: Do NOT import PyQt5 or AppController here to avoid DLL conflicts with faster-whisper
+# Only in the app process: with STT_WORKER=1 the spawned STT worker re-runs this module as
+# __mp_main__, and must not load the audio, Gemini and screen-capture libraries (or faster-whisper
+# before its own engine does).
+if __name__ == "__main__":
+    with profiler.phase("import audio_capture"):
+        from audio_capture import AudioCapture
+    with profiler.phase("import stt_engine"):
+        from stt_engine import create_stt_engine
+    # With STT_WORKER=1 (.env, loaded by stt_engine) Whisper runs in its own process (stt_worker.py)
+    # and CTranslate2 never loads here. Otherwise it must be imported before any PyQt5 import.
+    if os.getenv("STT_WORKER", "0") != "1":
+        with profiler.phase("import faster-whisper"):
+            import faster_whisper
+    with profiler.phase("import ai_engine (google-generativeai)"):
+        from ai_engine import AIEngine
+    with profiler.phase("import screen_capture"):
+        from screen_capture import ScreenCapture
 
 # Global flags
 running = True
 
+def load_stt_engine():
+    """Load Whisper and run a warm-up inference (runs on a background thread)."""
+    with profiler.phase("whisper model load", thread="stt-loader"):
+        engine = create_stt_engine()
+    with profiler.phase("whisper warm-up inference", thread="stt-loader"):
+        engine.warm_up()
+    print("STT Engine ready.")
+    return engine
+
 if __name__ == "__main__":
     # Minimize Console Window
     import ctypes
@@ -25,53 +93,65 @@ if __name__ == "__main__":
         pass
 
     print("Initializing Application...")
+
+    # Optional timing dumps for offline analysis
+    from metrics import metrics
+    if _arg_value("--metrics-jsonl"):
+        metrics.enable_jsonl(_arg_value("--metrics-jsonl"))
+    if _arg_value("--chrome-trace"):
+        metrics.enable_chrome_trace(_arg_value("--chrome-trace"))
+    atexit.register(metrics.close)
+
     try:
-        # 1. Initialize STT Engine FIRST (loads faster-whisper / CTranslate2)
-        # This must happen before ANY PyQt5 imports to avoid DLL conflicts (libomp/mkl)
-        print("Pre-initializing STT Engine...")
-        stt_engine = STTEngine(model_size="base")
-        print("STT Engine pre-initialized successfully.")
+        # 1. Load the STT model in the background while the profile window is open.
+        # faster-whisper / CTranslate2 were already imported above, before ANY PyQt5 import,
+        # which is what avoids the DLL conflicts (libomp/mkl). Building the model afterwards is safe.
+        # In worker mode this starts the STT process and waits for its model instead.
+        print("Loading STT Engine in the background...")
+        stt_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt-loader")
+        stt_future = stt_loader.submit(load_stt_engine)
+        stt_loader.shutdown(wait=False)
 
         # 2. Profile Selection
         print("Launching Profile Selection...")
-        from PyQt5.QtWidgets import QApplication
-        from profile_ui import ProfileSelectionWindow
-        
-        # We need a temporary QApplication for the profile window if one doesn't exist
-        # But AppController creates one too. 
-        # Strategy: Create one QApplication here, pass it or let AppController handle it.
-        # Actually, AppController creates QApplication(sys.argv). 
-        # We should create it ONCE here.
-        
-        app = QApplication(sys.argv)
-        
-        profile_win = ProfileSelectionWindow()
-        profile_win.show()
-        app.exec_() # Wait for window to close
-        
+        with profiler.phase("import PyQt5 + profile_ui"):
+            from PyQt5.QtWidgets import QApplication
+            from profile_ui import ProfileSelectionWindow
+
+        # Create the QApplication ONCE here and hand it to AppController.
+        with profiler.phase("Qt profile window creation"):
+            app = QApplication(sys.argv)
+            profile_win = ProfileSelectionWindow()
+            profile_win.show()
+
+        with profiler.phase("profile selection (user)"):
+            app.exec_() # Wait for window to close
+
         profile_data, profile_filename = profile_win.get_profile()
-        
+
         if not profile_data:
             print("No profile selected. Exiting.")
             sys.exit(0)
-            
+
         print(f"Profile loaded: {profile_data.get('name')}")
 
         # 3. NOW import and start AppController
         print("Importing UI modules...")
-        from app_controller import AppController
-        
+        with profiler.phase("import app_controller"):
+            from app_controller import AppController
+
         print("Initializing Controller...")
-        # Pass app instance to avoid creating another one, or just pass profile
-        # We need to modify AppController to accept existing app or not create new one if exists.
-        # Let's modify AppController to accept profile_data and profile_filename
-        
-        # Note: AppController.__init__ creates QApplication. We should change that.
-        # But for now, let's just pass the data.
-        controller = AppController(stt_engine, profile_data, profile_filename, app_instance=app)
+        # The controller gets the STT future; its STT worker waits on it before decoding.
+        with profiler.phase("controller init (total)"):
+            controller = AppController(stt_future, profile_data, profile_filename, app_instance=app, profiler=profiler)
+
+        if profiler.enabled:
+            # Runs immediately if the model is already loaded, else once it is
+            stt_future.add_done_callback(lambda f: profiler.report())
+
         print("Controller initialized. Starting...")
         controller.start()
-        
+
     except Exception as e:
         print("CRITICAL ERROR in Main:")
         import traceback
@@ -0,0 +1,220 @@
+"""
+Lightweight latency instrumentation.
+
+Components stamp timing spans with `metrics.span("whisper_transcribe")` (or record()
+for spans whose start was stamped elsewhere), and the pipeline adds the stages of
+every utterance trace (VAD hangover, queue waits, STT, LLM, end-to-end). Every span feeds a bounded
+histogram per name; the overlay shows a one-line summary, and spans can be
+streamed to JSONL or saved as a Chrome trace (chrome://tracing, Perfetto).
+"""
+import bisect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds: 1 ms .. 100 s, 20 buckets per decade (~12% wide)
+BUCKETS = [10 ** (i / 20) / 1000 for i in range(0, 101)]
+
+# Spans shown in the overlay status line, with their short labels
+STATUS_SPANS = [
+    ("vad_hangover", "VAD"),
+    ("stt_decode", "STT"),
+    ("llm_first_token", "TTFT"),
+    ("speech_end_to_first_token", "E2E"),
+    ("ui_repaint", "UI"),
+]
+
+# Hit rates shown in the status line: (hit counter, miss counter, label)
+STATUS_RATES = [
+    ("speculation_hit", "speculation_miss", "Spec"),
+]
+
+# Chrome trace events kept in memory until close()
+MAX_TRACE_EVENTS = 200000
+# Chrome trace track for per-utterance stages (they span several threads)
+UTTERANCE_TRACK = 0
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram: constant memory however long the session runs."""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (seconds)."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100.0)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_s": self.total / self.count if self.count else None,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "max_s": self.max,
+            "last_s": self.last,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.histograms = {}
+        self.counters = {}
+        self.jsonl_file = None
+        self.trace_path = None
+        self.trace_events = []
+        self.thread_names = {}
+
+    # --- recording -------------------------------------------------------
+
+    def record(self, name, start, end=None, track=None, **args):
+        """Record a span between two perf_counter stamps (on the calling thread's track by default)."""
+        end = time.perf_counter() if end is None else end
+        duration = end - start
+        tid = threading.get_ident() if track is None else track
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = LatencyHistogram()
+            hist.add(duration)
+
+            if self.jsonl_file:
+                self.jsonl_file.write(json.dumps({
+                    "name": name, "start": start - self.origin, "duration": duration,
+                    "thread": threading.current_thread().name, **args,
+                }) + "\n")
+
+            if self.trace_path and len(self.trace_events) < MAX_TRACE_EVENTS:
+                if tid not in self.thread_names:
+                    self.thread_names[tid] = "utterances" if track is not None else threading.current_thread().name
+                self.trace_events.append({
+                    "name": name, "ph": "X", "pid": 1, "tid": tid,
+                    "ts": (start - self.origin) * 1e6, "dur": duration * 1e6, "args": args,
+                })
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, **args)
+
+    def increment(self, name, n=1):
+        """Bump an event counter (cache hits, cancelled requests, ...)."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_trace(self, trace):
+        """Record the end-to-end spans of one utterance trace (see Pipeline.on_trace)."""
+        for name, (start_key, end_key) in TRACE_STAGES.items():
+            if start_key in trace and end_key in trace:
+                self.record(name, trace[start_key], trace[end_key], track=UTTERANCE_TRACK)
+
+    # --- reporting -------------------------------------------------------
+
+    def histogram(self, name):
+        with self.lock:
+            hist = self.histograms.get(name)
+            return hist.to_dict() if hist else None
+
+    def counter(self, name):
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def rate(self, hit_name, miss_name):
+        """hits / (hits + misses), or None before the first event."""
+        with self.lock:
+            hits = self.counters.get(hit_name, 0)
+            total = hits + self.counters.get(miss_name, 0)
+        return hits / total if total else None
+
+    def snapshot(self):
+        with self.lock:
+            return {name: hist.to_dict() for name, hist in self.histograms.items()}
+
+    def status_line(self):
+        """Compact 'STT 310ms · TTFT 620ms' line of p50 latencies for the overlay."""
+        parts = []
+        with self.lock:
+            for name, label in STATUS_SPANS:
+                hist = self.histograms.get(name)
+                if hist and hist.count:
+                    parts.append(f"{label} {hist.percentile(50) * 1000:.0f}ms")
+        for hit_name, miss_name, label in STATUS_RATES:
+            rate = self.rate(hit_name, miss_name)
+            if rate is not None:
+                parts.append(f"{label} {rate * 100:.0f}%")
+        return " · ".join(parts)
+
+    # --- output ----------------------------------------------------------
+
+    def enable_jsonl(self, path):
+        """Stream every span as one JSON line to `path`."""
+        with self.lock:
+            self.jsonl_file = open(path, "a", encoding="utf-8", buffering=1024 * 64)
+
+    def enable_chrome_trace(self, path):
+        """Collect spans and write them as a Chrome trace file on close()."""
+        with self.lock:
+            self.trace_path = path
+
+    def close(self):
+        with self.lock:
+            if self.jsonl_file:
+                self.jsonl_file.close()
+                self.jsonl_file = None
+            if self.trace_path:
+                events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                          for tid, name in self.thread_names.items()]
+                with open(self.trace_path, "w", encoding="utf-8") as f:
+                    json.dump({"traceEvents": events + self.trace_events, "displayTimeUnit": "ms"}, f)
+                print(f"Chrome trace written to: {self.trace_path}")
+                self.trace_path = None
+
+
+# Stages of one utterance trace: name -> (start stamp, end stamp)
+TRACE_STAGES = {
+    "vad_hangover": ("speech_end", "queued"),
+    "stt_queue_wait": ("queued", "stt_start"),
+    "stt_decode": ("stt_start", "text"),
+    "llm_queue_wait": ("text", "llm_start"),
+    "llm_first_token": ("llm_start", "first_token"),
+    "llm_total": ("llm_start", "answer"),
+    "speech_end_to_text": ("speech_end", "text"),
+    "speech_end_to_first_token": ("speech_end", "first_token"),
+    "speech_end_to_answer": ("speech_end", "answer"),
+}
+
+
+def trace_latencies(trace):
+    """Per-stage durations (seconds) of one utterance trace."""
+    return {name: trace[end_key] - trace[start_key]
+            for name, (start_key, end_key) in TRACE_STAGES.items()
+            if start_key in trace and end_key in trace}
+
+
+# Process-wide instance
+metrics = Metrics()
@@ -3,6 +3,9 @@ from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject
 from PyQt5.QtGui import QColor, QFont
 import sys
 
+from answer_view import AnswerView
+from metrics import metrics
+
 class OverlayWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -54,27 +57,49 @@ class OverlayWindow(QMainWindow):
         self.text_label.setAlignment(Qt.AlignTop)
         self.layout.addWidget(self.text_label)
         
-        self.suggestion_label = QLabel("")
-        self.suggestion_label.setStyleSheet("color: #00ffff; font-size: 14px; background-color: rgba(0, 0, 0, 180); padding: 10px; border-radius: 5px; border: 1px solid #00ffff;")
-        self.suggestion_label.setWordWrap(True)
-        self.suggestion_label.setAlignment(Qt.AlignTop)
-        self.suggestion_label.hide() # Hide initially
-        self.layout.addWidget(self.suggestion_label)
+        # Scrollback of questions and streamed answers (answer_view.py)
+        self.answer_view = AnswerView()
+        self.answer_view.setStyleSheet("color: #00ffff; font-size: 14px; background-color: rgba(0, 0, 0, 180); padding: 10px; border-radius: 5px; border: 1px solid #00ffff;")
+        self.answer_view.hide() # Hide until the first answer
+        self.layout.addWidget(self.answer_view, 1)
 
         self.layout.addStretch()
 
+        # Question the next answer belongs to
+        self.pending_question = ""
+
+        # Live latency summary (p50 per stage), refreshed once a second
+        self.metrics_label = QLabel("")
+        self.metrics_label.setStyleSheet("color: #aaaaaa; font-size: 10px;")
+        self.layout.insertWidget(1, self.metrics_label)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.update_metrics)
+        self.metrics_timer.start()
+
     def update_status(self, text):
         self.status_label.setText(text)
 
     def update_text(self, text):
         self.text_label.setText(text)
 
+    def update_question(self, text):
+        self.pending_question = text or ""
+
     def update_suggestion(self, text):
-        if text:
-            self.suggestion_label.setText(text)
-            self.suggestion_label.show()
-        else:
-            self.suggestion_label.hide()
+        """Start a new answer (first chunk, or a whole cached answer)."""
+        if not text:
+            return
+        self.answer_view.start_answer(self.pending_question, text)
+        self.pending_question = ""
+        self.answer_view.show()
+
+    def append_suggestion(self, text):
+        self.answer_view.append(text)
+        self.answer_view.show()
+
+    def update_metrics(self):
+        self.metrics_label.setText(metrics.status_line())
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -0,0 +1,495 @@
+import threading
+import time
+
+from ai_engine import ERROR_RESPONSE, LLMExecutor
+from audio_capture import LOCAL
+from conversation_memory import ConversationMemory, QUESTION_TOKENS, clip_to_tokens
+from metrics import metrics
+from question_detector import QuestionDetector
+from response_cache import normalize_question
+from stt_engine import StreamingTranscriber
+
+# Shorter questions ("why?", "and then?") depend on the conversation, so they bypass the answer cache
+MIN_CACHED_QUESTION_WORDS = 4
+
+# Speculative requests allowed per phrase, so a rambling speaker can't fan out API calls
+MAX_SPECULATIONS = 3
+
+class Speculation:
+    """
+    An answer requested from a partial transcript before the phrase has ended.
+    Chunks are buffered on a background thread until the final transcript either
+    claims the answer (stream()) or discards it (cancel()). It runs on an engine
+    slot reserved from `llm` and gives the slot back when the request ends.
+    """
+    def __init__(self, llm, query_text, question, history=None):
+        # The transcript the answer is generated for; the final query takes this text over
+        self.query_text = query_text
+        self.history = history
+        self.question = normalize_question(question)
+        self.cancel_event = threading.Event()
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.done = False
+        thread = threading.Thread(target=self._run, args=(llm,), name="llm-speculative")
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, llm):
+        try:
+            for chunk in llm.engine.generate_response_stream(self.query_text, cancel_event=self.cancel_event,
+                                                             history=self.history):
+                with self.cond:
+                    self.chunks.append(chunk)
+                    self.cond.notify_all()
+        except Exception as e:
+            print(f"Speculative request failed: {e}")
+        finally:
+            llm.release()
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def matches(self, question):
+        """
+        True if `question` has exactly the partial's words: only punctuation, case and filler
+        may differ. A final text that adds a word ("... a list" -> "... a list and a tuple")
+        or drops one asks something else.
+        """
+        return self.question == normalize_question(question)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def stream(self):
+        """Yield the chunks received so far, then the rest as they arrive."""
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.chunks) and not self.done:
+                    self.cond.wait()
+                if i >= len(self.chunks):
+                    return
+                chunk = self.chunks[i]
+            i += 1
+            yield chunk
+
+
+class Query:
+    """A question for the LLM stage plus the latency traces of the utterances behind it."""
+    def __init__(self, text, traces=None, speculation=None, question=None):
+        self.text = text
+        # The question the detector found (text also carries whatever was said before it).
+        # The answer cache is keyed on this; None means the answer is never cached.
+        self.question = question
+        self.traces = traces or []
+        # Answer already in flight for exactly this text, if the speculation matched
+        self.speculation = speculation
+        self.future = None
+        self.shown = False  # at least one answer chunk reached the UI
+
+
+def merge_queries(older, newer):
+    """A question asked before the previous one got any answer is merged into it."""
+    # The newer speculative answer doesn't cover the merged question (the older one is superseded anyway)
+    if newer.speculation:
+        newer.speculation.cancel()
+        metrics.increment("speculation_miss")
+    # Not cached: the answer covers two questions at once, not either of them
+    return Query(clip_to_tokens(older.text + " " + newer.text, QUESTION_TOKENS), older.traces + newer.traces)
+
+
+class Pipeline:
+    """
+    Capture -> STT -> LLM, each stage on its own thread(s).
+
+    AudioCapture records on its own thread(s) and queues phrases, each tagged with
+    its source. Only remote phrases (the other side of the call) can become
+    questions; the user's own (local) speech is transcribed into the conversation
+    memory so follow-ups have context, but never triggers a request. The STT worker blocks
+    on it, transcribes, runs the question detector and submits queries to an
+    LLMExecutor, so a slow model response never stalls transcription. A newer question
+    supersedes the one being answered: the old request is cancelled and its late
+    chunks are discarded, so only the newest answer reaches the UI. A question that
+    got no answer chunk yet is merged into the newer one instead of being lost.
+    Every question goes out with the earlier conversation from `memory`, kept within
+    a fixed token budget (summary of older turns + the most recent ones).
+
+    With an answer_cache, repeated (or reworded) questions are answered from it
+    without a model round-trip; refresh_cached regenerates hits in the background.
+
+    With speculative=True (needs streaming), a partial transcript that looks like a
+    finished question starts the LLM request during the end-of-speech hangover. The
+    final phrase keeps that in-flight answer if it still matches, else it is cancelled.
+
+    UI updates go through callbacks so the pipeline can run with or without Qt.
+    stt_engine may be a Future that resolves to the engine (background model load);
+    capture starts right away and the STT worker waits for the model before decoding.
+    """
+    def __init__(self, audio_capture, stt_engine, ai_engine, streaming=True,
+                 on_text=None, on_status=None, on_suggestion=None, on_suggestion_chunk=None,
+                 on_question=None, on_answer=None, on_trace=None, answer_cache=None, refresh_cached=False,
+                 speculative=False, question_detector=None, max_in_flight=2, memory=None):
+        self.audio_capture = audio_capture
+        self.stt_engine = stt_engine
+        self.ai_engine = ai_engine
+        self.streaming = streaming
+        self.streamer = None
+
+        self.on_text = on_text or (lambda text: None)
+        self.on_status = on_status or (lambda text: None)
+        self.on_suggestion = on_suggestion or (lambda text: None)
+        self.on_suggestion_chunk = on_suggestion_chunk or (lambda text: None)
+        # Called with the question right before on_suggestion starts showing its answer
+        self.on_question = on_question or (lambda text: None)
+        # Called with the question, the final answer and the traces of the utterances behind it
+        self.on_answer = on_answer or (lambda question, answer, traces: None)
+        # Called with one dict of perf_counter stamps per utterance once it is fully handled
+        self._on_trace = on_trace or (lambda trace: None)
+
+        self.llm = LLMExecutor(ai_engine, max_in_flight=max_in_flight)
+        # Newest query sent to the LLM, and how many submitted ones are not finished yet
+        self.current_query = None
+        self.unanswered = 0
+        # Earlier questions and answers, rendered into every prompt within a fixed token budget
+        self.memory = memory or ConversationMemory()
+        self.answer_cache = answer_cache
+        self.refresh_cached = refresh_cached
+        self.detector = question_detector or QuestionDetector()
+        # Traces of the fragments of a question the detector is still holding
+        self.held_traces = []
+
+        self.speculative = speculative and streaming
+        # Owned by the STT worker: the speculation for the phrase being spoken
+        self.speculation = None
+        self.speculation_count = 0
+        self.last_partial = ""
+        self.held_speculation = None
+
+        self.running = False
+        self.stt_busy = False
+        self.threads = []
+        self.transcript = ""
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.running = True
+        self.audio_capture.start()
+        thread = threading.Thread(target=self._stt_loop, name="stt-worker")
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+        print("Listening...")
+
+    def stop(self, timeout=2.0):
+        """Stop capture, wake the STT worker and wait for it to exit, then cancel pending answers."""
+        self.running = False
+        self._drop_speculation()
+        self.audio_capture.stop()
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+        self.threads = []
+        self.llm.shutdown()
+
+    def on_trace(self, trace):
+        metrics.record_trace(trace)
+        self._on_trace(trace)
+
+    # --- STT stage -------------------------------------------------------
+
+    def _wait_for_stt(self):
+        if hasattr(self.stt_engine, "result"):
+            if not self.stt_engine.done():
+                self.on_status("Loading speech model...")
+            self.stt_engine = self.stt_engine.result()
+            self.on_status("Active")
+        if self.streaming:
+            self.streamer = StreamingTranscriber(self.stt_engine)
+
+    def _stt_loop(self):
+        try:
+            self._wait_for_stt()
+        except Exception as e:
+            print(f"STT engine failed to load: {e}")
+            self.on_status("Speech model failed to load")
+            return
+
+        while self.running:
+            try:
+                self.audio_capture.wait(timeout=0.5)
+                if not self.running:
+                    break
+
+                # Finished phrases first, so a partial never belongs to an older phrase
+                self.stt_busy = True
+                audio_chunk = self.audio_capture.get_audio_chunk()
+                while audio_chunk is not None:
+                    self._transcribe_phrase(audio_chunk, self.audio_capture.last_chunk_info)
+                    audio_chunk = self.audio_capture.get_audio_chunk()
+                # A held question is asked once its debounce / hold window runs out
+                if self.detector.holding and self.detector.poll():
+                    self._post_query(self.held_speculation)
+                self.stt_busy = False
+
+                if self.streamer:
+                    partial_chunk = self.audio_capture.get_partial_chunk()
+                    if partial_chunk is not None:
+                        self._show_partial(partial_chunk)
+            except Exception as e:
+                print(f"Error in STT worker: {e}")
+                self.stt_busy = False
+                time.sleep(1)
+
+    def _show_partial(self, partial_chunk):
+        committed, tentative = self.streamer.update(partial_chunk)
+        partial_text = (committed + " " + tentative).strip()
+        if partial_text:
+            with self.lock:
+                transcript = self.transcript
+            self.on_text((transcript + " " + partial_text)[-300:])
+            if self.speculative:
+                self._speculate(transcript, partial_text)
+        self.last_partial = partial_text
+
+    # --- speculation -----------------------------------------------------
+
+    def _speculate(self, transcript, partial_text):
+        """Start (or restart) a speculative answer once the partial looks like a finished question."""
+        if self.speculation:
+            if self.speculation.matches(partial_text):
+                return
+            self._drop_speculation()
+        # Stable across two snapshots means the speaker paused; a '?' means Whisper heard a question
+        stable = partial_text == self.last_partial or partial_text.endswith("?")
+        if not stable or self.speculation_count >= MAX_SPECULATIONS or not self.detector.is_question(partial_text):
+            return
+        if self.answer_cache and self.answer_cache.get(partial_text, touch=False) is not None:
+            return
+        # Speculation only uses spare capacity: it counts against LLM_MAX_IN_FLIGHT like any request
+        if not self.llm.reserve():
+            return
+        self.speculation_count += 1
+        self.speculation = Speculation(self.llm, clip_to_tokens(transcript + " " + partial_text, QUESTION_TOKENS),
+                                       partial_text, self.memory.context())
+
+    def _drop_speculation(self):
+        for speculation in (self.speculation, self.held_speculation):
+            if speculation:
+                speculation.cancel()
+                metrics.increment("speculation_miss")
+        self.speculation = None
+        self.held_speculation = None
+
+    def _claim_speculation(self, text):
+        """Hand the in-flight answer to the final query if it was asked from this text."""
+        speculation, self.speculation = self.speculation, None
+        self.speculation_count = 0
+        self.last_partial = ""
+        if speculation and speculation.matches(text):
+            return speculation
+        if speculation:
+            speculation.cancel()
+            metrics.increment("speculation_miss")
+        return None
+
+    def _transcribe_phrase(self, audio_chunk, chunk_info=None):
+        trace = dict(chunk_info or {})
+        trace["stt_start"] = time.perf_counter()
+        if trace.get("source") == LOCAL:
+            # Not through the streamer: its partial state belongs to the remote phrase
+            text = self.stt_engine.transcribe(audio_chunk)
+            trace["text"] = time.perf_counter()
+            trace["transcript"] = text
+            self.handle_local_text(text, trace)
+            return
+        if self.streamer:
+            text = self.streamer.finalize(audio_chunk)
+        else:
+            text = self.stt_engine.transcribe(audio_chunk)
+        trace["text"] = time.perf_counter()
+        trace["transcript"] = text
+        if text:
+            print(f"Transcribed: {text}")
+            self.handle_text(text, trace)
+        else:
+            self._drop_speculation()
+            self.speculation_count = 0
+            self.last_partial = ""
+            self.on_trace(trace)
+
+    def handle_text(self, text, trace=None):
+        """Append transcribed text and post a query to the LLM stage once the detector sees a question."""
+        trace = trace if trace is not None else {"text": time.perf_counter(), "transcript": text}
+        with self.lock:
+            self.transcript += " " + text
+            transcript = self.transcript
+
+        # Update UI
+        self.on_text(transcript[-300:])
+
+        fire = self.detector.feed(text)
+        # A finished phrase settles any speculation on it: kept for the question it belongs to, or cancelled
+        speculation = self._claim_speculation(text if fire or self.detector.holding else "")
+        if self.held_speculation:
+            # Asked before this fragment arrived, so it answers an unfinished question
+            self.held_speculation.cancel()
+            metrics.increment("speculation_miss")
+            self.held_speculation = None
+
+        if fire:
+            self.held_traces.append(trace)
+            self._post_query(speculation)
+        elif self.detector.holding:
+            self.held_traces.append(trace)
+            self.held_speculation = speculation
+        else:
+            self.on_trace(trace)
+
+    def handle_local_text(self, text, trace=None):
+        """The user's own speech: kept as conversation context, never sent to the LLM as a question."""
+        if text:
+            print(f"You said: {text}")
+            metrics.increment("local_phrases")
+            self.memory.add_turn("candidate", text)
+        self.on_trace(trace if trace is not None else {"text": time.perf_counter(), "transcript": text})
+
+    def _post_query(self, speculation=None):
+        """Hand the transcript so far to the LLM; new speech starts the next question."""
+        with self.lock:
+            transcript = self.transcript
+            self.transcript = ""
+        traces, self.held_traces = self.held_traces, []
+        self.held_speculation = None
+        text, question = clip_to_tokens(transcript, QUESTION_TOKENS), self.detector.last_question
+        if speculation:
+            if traces:
+                traces[-1]["speculative"] = True
+            # Shown, remembered and logged under the text the answer was generated for. The cache
+            # key must be that text too: a question held over several phrases is not cached.
+            text = speculation.query_text
+            if not speculation.matches(question):
+                question = None
+        self._ask(Query(text, traces, speculation, question=question))
+
+    # --- LLM stage -------------------------------------------------------
+
+    def _ask(self, query):
+        """Answer from the cache, or submit to the LLM and supersede the previous question."""
+        with self.lock:
+            previous = self.current_query
+            if previous and not previous.shown and previous.future and not previous.future.done():
+                # Nothing shown for the older question yet: ask both together
+                print("LLM busy, merging with pending question.")
+                query = merge_queries(previous, query)
+                previous.traces = []
+            self.current_query = query
+
+        response = self._cached_answer(query)
+        if response is not None:
+            if query.speculation:
+                query.speculation.cancel()
+                metrics.increment("speculation_miss")
+            self._finish(query, response)
+            return
+
+        print("Using speculative answer..." if query.speculation else "Querying LLM...")
+        self.on_status("Thinking...")
+        llm_start = time.perf_counter()
+        for trace in query.traces:
+            trace["llm_start"] = llm_start
+        stream = cancel_event = None
+        if query.speculation:
+            metrics.increment("speculation_hit")
+            stream, cancel_event = query.speculation.stream(), query.speculation.cancel_event
+        with self.lock:
+            self.unanswered += 1
+        query.future = self.llm.submit(query.text, on_chunk=lambda chunk, first: self._show_chunk(query, chunk, first),
+                                       stream=stream, cancel_event=cancel_event, history=self.memory.context())
+        query.future.add_done_callback(lambda future: self._answer_done(query, future))
+
+    def _show_chunk(self, query, chunk, first):
+        """Runs on the LLM executor, only while query is the newest question."""
+        if first:
+            # First token starts a new answer
+            self.on_question(query.text)
+            self.on_suggestion(chunk)
+            query.shown = True
+            first_token = time.perf_counter()
+            for trace in query.traces:
+                trace["first_token"] = first_token
+        else:
+            self.on_suggestion_chunk(chunk)
+
+    def _answer_done(self, query, future):
+        response = None
+        try:
+            if not future.cancelled():
+                response = future.result()
+            if response is None:
+                print(f"Discarded answer to superseded question: {query.text[-60:]!r}")
+            elif self._cacheable(query) and response != ERROR_RESPONSE:
+                self.answer_cache.put(query.question, response)
+        except Exception as e:
+            print(f"Error in LLM request: {e}")
+        finally:
+            answer_done = time.perf_counter()
+            for trace in query.traces:
+                trace["answer"] = answer_done
+                trace["superseded"] = response is None
+            self._finish(query, response)
+            with self.lock:
+                self.unanswered -= 1
+
+    def _finish(self, query, response):
+        """Show a final answer (if any) and hand the query's traces on."""
+        try:
+            if response:
+                if response != ERROR_RESPONSE:
+                    self.memory.add_exchange(query.text, response)
+                self.on_answer(query.text, response, list(query.traces))
+                # Answered question leaves the transcript view; keep anything said since
+                with self.lock:
+                    transcript = self.transcript
+                self.on_text(transcript[-300:].strip())
+            with self.lock:
+                newest = self.current_query is query
+            if newest:
+                self.on_status("Active")
+        finally:
+            with self.lock:
+                traces, query.traces = query.traces, []
+            for trace in traces:
+                self.on_trace(trace)
+
+    def _cacheable(self, query):
+        return (bool(self.answer_cache) and bool(query.question)
+                and len(normalize_question(query.question).split()) >= MIN_CACHED_QUESTION_WORDS)
+
+    def _cached_answer(self, query):
+        """Answer from the cache if this question (or a near-duplicate) was answered before."""
+        if not self._cacheable(query):
+            return None
+        start = time.perf_counter()
+        with metrics.span("answer_cache_lookup"):
+            answer = self.answer_cache.get(query.question)
+        if answer is None:
+            return None
+        print("Answered from cache.")
+        done = time.perf_counter()
+        for trace in query.traces:
+            trace["llm_start"] = start
+            trace["first_token"] = done
+            trace["answer"] = done
+            trace["cached"] = True
+        # Nothing still streaming may overwrite the cached answer
+        self.llm.cancel_all()
+        self.on_question(query.text)
+        self.on_suggestion(answer)
+        if self.refresh_cached:
+            self.answer_cache.refresh(query.question, self.ai_engine.generate_response)
+        return answer
+
+    def is_idle(self):
+        """True when no phrase or query is queued or being processed."""
+        return (not self.stt_busy and not self.detector.holding and self.unanswered == 0
+                and self.audio_capture.audio_queue.empty())
@@ -0,0 +1,305 @@
+"""
+Retrieval over long profile material (project write-ups, résumés, notes).
+
+A profile may list attached documents ("documents": [paths]) and may have long
+free-text fields. Instead of pasting all of it into the system prompt, the text is
+split into small overlapping chunks, embedded locally on CPU and stored in an
+on-disk vector index (cache/<profile>_rag.npz + .json). For each question only the
+top-k most similar chunks are added to the prompt, within RAG_TOKENS.
+
+Embeddings come from fastembed (ONNX, pip install fastembed) when it is installed,
+otherwise from a dependency-free hashed bag-of-words embedder, which is
+keyword-level but fast and deterministic. Documents are re-embedded only when
+their content or the embedder changes.
+
+Supported documents: .txt / .md, .pdf (pip install pypdf), .docx (pip install python-docx).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from conversation_memory import clip_to_tokens, estimate_tokens
+
+try:
+    from fastembed import TextEmbedding
+except ImportError:
+    TextEmbedding = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+CACHE_DIR = "cache"
+PROFILE_DIR = "profiles"
+
+FASTEMBED_MODEL = os.getenv("PROFILE_EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+CHUNK_TOKENS = 120       # per chunk (estimated tokens)
+CHUNK_OVERLAP = 25       # carried over from the previous chunk so facts aren't cut in half
+# Bumped when chunk_text() changes, so stored indexes are re-chunked
+CHUNKER_VERSION = 2
+TOP_K = 4
+RAG_TOKENS = 450         # retrieved excerpts added per question
+# Profile fields longer than this move out of the system prompt into the index
+FIELD_PROMPT_TOKENS = 200
+
+HASH_DIM = 1024
+HASH_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "with", "is", "are", "was", "were",
+    "be", "it", "this", "that", "i", "you", "we", "my", "your", "me", "as", "by", "from", "so", "do", "did",
+}
+
+
+def read_document(path):
+    """Plain text of an attached document; raises on unsupported or unreadable files."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        if pypdf is None:
+            raise RuntimeError("pypdf is not installed (pip install pypdf).")
+        return "\n\n".join(page.extract_text() or "" for page in pypdf.PdfReader(path).pages)
+    if ext == ".docx":
+        if docx is None:
+            raise RuntimeError("python-docx is not installed (pip install python-docx).")
+        return "\n\n".join(p.text for p in docx.Document(path).paragraphs)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def split_words(sentence, max_tokens):
+    """
+    Split a sentence into pieces of at most max_tokens estimated tokens, at word boundaries.
+    Only long sentences are split: tables, or lists without punctuation (PDF résumé bullets).
+    """
+    pieces = []
+    current = []
+    size = 0
+    for word in sentence.split():
+        # estimate_tokens of the joined piece, counted incrementally (+1 char for the space)
+        size += len(word) + (1 if current else 0)
+        if current and (size + 3) // 4 > max_tokens:
+            pieces.append(" ".join(current))
+            current, size = [], len(word)
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Pack sentences into ~max_tokens chunks, repeating the last ~overlap tokens of each."""
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            sentences.extend(split_words(sentence, max_tokens))
+
+    chunks = []
+    current = []
+    for sentence in sentences:
+        if current and estimate_tokens(" ".join(current + [sentence])) > max_tokens:
+            chunks.append(" ".join(current))
+            carried = []
+            while current and estimate_tokens(" ".join(carried + current[-1:])) <= overlap:
+                carried.insert(0, current.pop())
+            current = carried
+        current.append(sentence)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class HashEmbedder:
+    """Hashed unigrams + bigrams, log-scaled and L2-normalized. No model, microseconds per text."""
+    name = f"hash-{HASH_DIM}"
+    # Cosine similarity below which an excerpt is just noise. A short question shares
+    # only a few words with a chunk, so relevant hits score low here.
+    min_score = 0.05
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [w for w in re.findall(r"\w+", text.lower()) if w not in HASH_STOPWORDS]
+            for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % HASH_DIM] += 1.0 if value >> 63 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class FastEmbedder:
+    """Small sentence-embedding model through fastembed (ONNX Runtime on CPU)."""
+    # bge-style models score unrelated English text around 0.3-0.5
+    min_score = 0.55
+
+    def __init__(self, model_name=FASTEMBED_MODEL):
+        self.name = f"fastembed-{model_name}"
+        self.model = TextEmbedding(model_name=model_name)
+        self.lock = threading.Lock()
+
+    def embed(self, texts):
+        with self.lock:
+            vectors = np.array(list(self.model.embed(list(texts))), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+def create_embedder(name=None):
+    """PROFILE_EMBEDDER=fastembed|hash (default: fastembed if installed)."""
+    name = name or os.getenv("PROFILE_EMBEDDER", "fastembed" if TextEmbedding is not None else "hash")
+    if name == "fastembed":
+        if TextEmbedding is None:
+            print("fastembed is not installed, using the hashed bag-of-words embedder.")
+            return HashEmbedder()
+        try:
+            return FastEmbedder()
+        except Exception as e:
+            print(f"fastembed model unavailable ({e}), using the hashed bag-of-words embedder.")
+    return HashEmbedder()
+
+
+def profile_sources(profile_data, profile_dir=PROFILE_DIR):
+    """(source name, text) for every attached document and every profile field too long for the prompt."""
+    sources = []
+    for field in ("intro", "projects"):
+        text = (profile_data.get(field) or "").strip()
+        if estimate_tokens(text) > FIELD_PROMPT_TOKENS:
+            sources.append((f"profile:{field}", text))
+    for path in profile_data.get("documents") or []:
+        full_path = path if os.path.isabs(path) else os.path.join(profile_dir, path)
+        try:
+            sources.append((os.path.basename(path), read_document(full_path)))
+        except Exception as e:
+            print(f"Skipping profile document {path}: {e}")
+    return sources
+
+
+class ProfileRetriever:
+    """
+    On-disk vector index of one profile's documents, queried per question.
+    Thread-safe for concurrent context() calls (LLM workers ask in parallel).
+    """
+    def __init__(self, sources, index_path=None, embedder=None, top_k=TOP_K, max_tokens=RAG_TOKENS,
+                 min_score=None):
+        self.embedder = embedder or create_embedder()
+        self.index_path = index_path
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self.min_score = self.embedder.min_score if min_score is None else min_score
+        self.lock = threading.Lock()
+        self.chunks = []   # {"source", "text"}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.build(sources)
+
+    @classmethod
+    def from_profile(cls, profile_data, profile_filename=None, cache_dir=CACHE_DIR, **kwargs):
+        """Retriever for a profile, or None if it has nothing that needs retrieval."""
+        if not profile_data:
+            return None
+        sources = profile_sources(profile_data)
+        if not sources:
+            return None
+        index_path = None
+        if profile_filename:
+            index_path = os.path.join(cache_dir, profile_filename.replace(".json", "") + "_rag")
+        return cls(sources, index_path=index_path, **kwargs)
+
+    def _load(self):
+        """Previously embedded chunks per source hash, if the index was built with the same embedder."""
+        if not self.index_path or not os.path.exists(self.index_path + ".json"):
+            return {}
+        try:
+            with open(self.index_path + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if (meta.get("embedder") != self.embedder.name or meta.get("chunk_tokens") != CHUNK_TOKENS
+                    or meta.get("chunker") != CHUNKER_VERSION):
+                return {}
+            vectors = np.load(self.index_path + ".npz")["vectors"]
+            cached = {}
+            for i, chunk in enumerate(meta["chunks"]):
+                cached.setdefault(chunk["hash"], []).append((chunk, vectors[i]))
+            return cached
+        except Exception as e:
+            print(f"Profile index unreadable, rebuilding: {e}")
+            return {}
+
+    def _save(self):
+        if not self.index_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+            np.savez(self.index_path + ".npz", vectors=self.vectors)
+            with open(self.index_path + ".json", "w", encoding="utf-8") as f:
+                json.dump({"embedder": self.embedder.name, "chunk_tokens": CHUNK_TOKENS,
+                           "chunker": CHUNKER_VERSION, "chunks": self.chunks}, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Failed to save profile index: {e}")
+
+    def build(self, sources):
+        """Chunk and embed the sources, reusing stored vectors for unchanged ones."""
+        start = time.perf_counter()
+        cached = self._load()
+        chunks, vectors, new_chunks = [], [], []
+        for source, text in sources:
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            if digest in cached:
+                for chunk, vector in cached[digest]:
+                    chunks.append(chunk)
+                    vectors.append(vector)
+                continue
+            for piece in chunk_text(text):
+                new_chunks.append(len(chunks))
+                chunks.append({"source": source, "hash": digest, "text": piece})
+                vectors.append(None)
+        if new_chunks:
+            embedded = self.embedder.embed([chunks[i]["text"] for i in new_chunks])
+            for i, vector in zip(new_chunks, embedded):
+                vectors[i] = vector
+        with self.lock:
+            self.chunks = chunks
+            self.vectors = np.array(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+        if new_chunks or len(cached) != len(sources):
+            self._save()
+        print(f"Profile index: {len(chunks)} chunks from {len(sources)} sources "
+              f"({len(new_chunks)} embedded, {self.embedder.name}) in {time.perf_counter() - start:.2f}s.")
+
+    def search(self, query, top_k=None):
+        """[(score, chunk)] best first, above min_score."""
+        top_k = top_k or self.top_k
+        with self.lock:
+            chunks, vectors = self.chunks, self.vectors
+        if not chunks or not query.strip():
+            return []
+        scores = vectors @ self.embedder.embed([query])[0]
+        k = min(top_k, len(chunks))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), chunks[i]) for i in best if scores[i] >= self.min_score]
+
+    def context(self, query):
+        """Retrieved excerpts rendered for the prompt, within max_tokens ("" if nothing relevant)."""
+        lines = []
+        budget = self.max_tokens
+        for score, chunk in self.search(query):
+            line = f"- ({chunk['source']}) {chunk['text']}"
+            if estimate_tokens(line) > budget:
+                if lines:
+                    break
+                # The best match is over budget on its own (e.g. an index from an older chunker): cut it to fit
+                line = clip_to_tokens(line, budget, keep="start")
+            lines.append(line)
+            budget -= estimate_tokens(line)
+        return "Relevant background from your documents:\n" + "\n".join(lines) if lines else ""
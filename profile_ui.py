@@ -7,6 +7,8 @@ from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
                              QFileDialog, QMessageBox, QListWidget, QStackedWidget)
 from PyQt5.QtCore import Qt
 
+from search_index import SearchIndex, list_profiles
+
 PROFILE_DIR = "profiles"
 
 class ProfileSelectionWindow(QWidget):
@@ -20,6 +22,13 @@ class ProfileSelectionWindow(QWidget):
         if not os.path.exists(PROFILE_DIR):
             os.makedirs(PROFILE_DIR)
 
+        # Profile list comes from the search index (falls back to listing the directory)
+        try:
+            self.search_index = SearchIndex(profile_dir=PROFILE_DIR)
+        except Exception as e:
+            print(f"Profile index unavailable: {e}")
+            self.search_index = None
+
     def initUI(self):
         self.setWindowTitle("AI Interview Assistant - Profile Selection")
         self.setGeometry(300, 300, 500, 400)
@@ -135,6 +144,17 @@ class ProfileSelectionWindow(QWidget):
         self.inp_projects.setStyleSheet(input_style)
         self.form_layout.addWidget(self.inp_projects)
 
+        # Documents (resume, project write-ups, notes): retrieved per question, see profile_rag.py
+        self.documents = []
+        doc_box = QHBoxLayout()
+        self.lbl_documents = QLabel("No documents attached")
+        self.btn_attach = QPushButton("Attach Documents...")
+        self.btn_attach.setStyleSheet("background-color: #555; color: white; padding: 5px;")
+        self.btn_attach.clicked.connect(self.attach_documents)
+        doc_box.addWidget(self.lbl_documents)
+        doc_box.addWidget(self.btn_attach)
+        self.form_layout.addLayout(doc_box)
+
         # Buttons
         btn_box = QHBoxLayout()
         self.btn_save = QPushButton("Save & Start")
@@ -152,9 +172,16 @@ class ProfileSelectionWindow(QWidget):
     def show_create_form(self):
         self.stacked_widget.setCurrentIndex(1)
 
+    def attach_documents(self):
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Attach Documents", "", "Documents (*.txt *.md *.pdf *.docx);;All Files (*)")
+        if paths:
+            self.documents = paths
+            self.lbl_documents.setText(", ".join(os.path.basename(p) for p in paths))
+
     def show_load_list(self):
         self.list_widget.clear()
-        files = [f for f in os.listdir(PROFILE_DIR) if f.endswith('.json')]
+        files = list_profiles(PROFILE_DIR, self.search_index)
         if not files:
             QMessageBox.information(self, "No Profiles", "No saved profiles found.")
             return
@@ -172,7 +199,8 @@ class ProfileSelectionWindow(QWidget):
             "intro": self.inp_intro.toPlainText().strip(),
             "company": self.inp_company.text().strip(),
             "skills": self.inp_skills.text().strip(),
-            "projects": self.inp_projects.toPlainText().strip()
+            "projects": self.inp_projects.toPlainText().strip(),
+            "documents": self.documents
         }
 
         date_str = datetime.datetime.now().strftime("%Y-%m-%d")
@@ -182,6 +210,8 @@ class ProfileSelectionWindow(QWidget):
         try:
             with open(filepath, 'w') as f:
                 json.dump(data, f, indent=4)
+            if self.search_index:
+                self.search_index.index_profile(filename, data)
             
             self.profile_data = data
             self.profile_filename = filename
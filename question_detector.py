@@ -0,0 +1,184 @@
+"""
+Local question / intent detection between STT and the LLM.
+
+Replaces the old trigger ("?" in the phrase, or 5 s since the last answer and more
+than 10 characters), which fired on statements and missed questions Whisper
+transcribed without a "?". Each finished phrase is scored by cheap rules
+(punctuation, question openers, interview prompts like "walk me through",
+statement and backchannel cues); no model or network call is involved.
+
+Phrases that look like the start of a question ("What's the difference between")
+are held and merged with the next fragment, and an optional debounce waits a
+little for follow-ups so "What is Docker? And how is it different from a VM?"
+becomes one query.
+"""
+import re
+import time
+
+# Leading words that don't change whether a phrase is a question
+LEADING_FILLERS = {
+    "oh", "hey", "hi", "hello", "ok", "okay", "so", "now", "um", "uh", "well", "right", "alright",
+    "and", "but", "then", "also", "actually", "basically", "yeah", "yes", "great", "good", "cool", "sure",
+}
+WH_WORDS = {"what", "what's", "whats", "why", "how", "how's", "when", "where", "which", "who", "who's", "whose"}
+AUX_VERBS = {
+    "do", "does", "did", "can", "could", "would", "will", "should", "shall", "have", "has", "had",
+    "is", "are", "was", "were", "may", "might", "don't", "doesn't", "didn't", "can't", "won't", "isn't", "aren't",
+}
+# Subjects that make "Do you ...", "Is it ..." an inverted question rather than a statement
+SUBJECTS = {"you", "we", "i", "it", "they", "he", "she", "there", "that", "this", "your", "the"}
+# Interview prompts that expect an answer without being grammatical questions
+PROMPT_PHRASES = (
+    "tell me", "tell us", "walk me through", "walk us through", "explain", "describe", "give me an example",
+    "give an example", "talk about", "talk me through", "what about", "how about", "i'd like to know",
+    "i would like to know", "i want to know", "i'm curious", "i am curious", "i was wondering",
+    "share an example", "take me through", "elaborate", "let's discuss", "let's talk about",
+    "write a", "write an", "implement", "design a", "design an", "how would you",
+)
+# Statement openers: the speaker is talking about themselves, not asking
+STATEMENT_OPENERS = (
+    "i think", "i have", "i am", "i'm", "i was", "i've", "i worked", "i used", "we use", "we have",
+    "we are", "we're", "our team", "my ", "that's", "that is", "this is", "it's", "it is",
+)
+# Whole phrases that never need an answer
+BACKCHANNELS = {
+    "okay", "ok", "great", "good", "cool", "right", "sure", "thanks", "thank you", "makes sense",
+    "that makes sense", "got it", "i see", "alright", "perfect", "nice", "awesome", "yes", "no", "yeah",
+    "mm hmm", "hmm", "interesting", "understood", "sounds good",
+}
+# Tag questions turn a statement into a confirmation request, not a real question
+TAG_ENDINGS = ("right?", "correct?", "isn't it?", "you know?", "yeah?", "ok?", "okay?", "no?")
+# A phrase ending in one of these (without punctuation) was cut off mid-sentence
+CONTINUATION_WORDS = {
+    "and", "or", "but", "the", "a", "an", "of", "to", "about", "with", "for", "in", "on", "at", "from",
+    "between", "like", "so", "because", "if", "your", "you", "is", "are", "what", "how", "that", "which",
+    "when", "where", "my", "our", "this", "these", "those", "some", "any", "into", "versus", "vs",
+}
+
+
+def _words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def is_incomplete(text):
+    """True if the phrase looks cut off mid-sentence (VAD split on a pause)."""
+    stripped = text.strip()
+    if not stripped:
+        return False
+    if stripped.endswith((",", "...", "-")):
+        return True
+    if stripped[-1] in ".?!":
+        return False
+    words = _words(stripped)
+    return bool(words) and words[-1] in CONTINUATION_WORDS
+
+
+def question_score(text):
+    """0..1 likelihood that `text` is a question or prompt that expects an answer."""
+    # "Hi, good morning. Can you hear me okay?" is a question if any of its sentences is
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+    if len(sentences) > 1:
+        return max(_sentence_score(s) for s in sentences)
+    return _sentence_score(text)
+
+
+def _sentence_score(text):
+    stripped = text.strip()
+    lowered = stripped.lower()
+    words = _words(stripped)
+    while words and words[0] in LEADING_FILLERS:
+        words = words[1:]
+    if not words:
+        return 0.0
+    body = " ".join(words)
+    if body in BACKCHANNELS:
+        return 0.0
+
+    score = 0.0
+    if stripped.endswith("?"):
+        score += 0.3 if lowered.endswith(TAG_ENDINGS) and len(words) > 3 else 0.6
+    elif "?" in stripped:
+        score += 0.4
+    if words[0] in WH_WORDS:
+        score += 0.5
+    elif words[0] in AUX_VERBS and len(words) > 1:
+        score += 0.5 if words[1] in SUBJECTS else 0.3
+    if any(phrase in body for phrase in PROMPT_PHRASES):
+        score += 0.5
+    if body.startswith(STATEMENT_OPENERS) and not stripped.endswith("?"):
+        score -= 0.4
+    if len(words) < 3 and not stripped.endswith("?"):
+        score -= 0.3
+    return max(0.0, min(1.0, score))
+
+
+class QuestionDetector:
+    """
+    Decides when the fragments heard so far form a question worth sending to the LLM.
+
+    feed() is called once per finished phrase and poll() periodically; either returns
+    True when the pending question should be asked now. A question is held while it
+    looks unfinished (up to max_hold seconds) and for `debounce` seconds after its
+    last fragment, merging whatever follows into the same query.
+    """
+    def __init__(self, threshold=0.5, debounce=0.0, max_hold=2.5):
+        self.threshold = threshold
+        self.debounce = debounce
+        self.max_hold = max_hold
+        self.phrases = 0
+        self.fired = 0
+        # Text of the question the last True from feed()/poll() asked for
+        self.last_question = ""
+        self.reset()
+
+    def reset(self):
+        self.question_parts = []
+        self.last_fragment = 0.0
+
+    def is_question(self, text):
+        return question_score(text) >= self.threshold
+
+    @property
+    def holding(self):
+        """True while a detected question waits for its end or for the debounce window."""
+        return bool(self.question_parts)
+
+    def question(self):
+        """Text of the question being held (its fragments merged)."""
+        return " ".join(self.question_parts)
+
+    def feed(self, text, now=None):
+        now = time.time() if now is None else now
+        self.phrases += 1
+        if self.question_parts:
+            self.question_parts.append(text)
+        elif self.is_question(text) or (is_incomplete(text) and self._opens_question(text)):
+            self.question_parts = [text]
+        else:
+            return False
+        self.last_fragment = now
+        return self._due(now)
+
+    def poll(self, now=None):
+        now = time.time() if now is None else now
+        return bool(self.question_parts) and self._due(now)
+
+    def _opens_question(self, text):
+        # "What's the difference between" scores as a question once the rest arrives
+        return question_score(text + "?") >= self.threshold
+
+    def _due(self, now):
+        waited = now - self.last_fragment
+        if is_incomplete(self.question_parts[-1]):
+            if waited < self.max_hold:
+                return False
+            # The rest never came; ask only if what was said stands as a question
+            if not self.is_question(self.question() + "?"):
+                self.reset()
+                return False
+        elif waited < self.debounce:
+            return False
+        self.last_question = self.question()
+        self.reset()
+        self.fired += 1
+        return True
@@ -0,0 +1,113 @@
+"""
+Offline replay: drive the whole pipeline (VAD -> STT -> trigger -> LLM) from WAV files.
+
+No sound device, Qt window or API key is needed with the default stub LLM backend.
+Prints an end-to-end latency trace per utterance:
+speech end -> text -> first token -> full answer.
+
+Usage:
+    python replay.py meeting.wav [more.wav ...] [--fast] [--llm stub|gemini|local]
+                     [--stt-profile balanced] [--no-streaming] [--speculative] [--debounce 0.5]
+                     [--trace trace.jsonl]
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from ai_engine import AIEngine
+from audio_capture import FileAudioCapture
+from llm_backends import BACKENDS, create_backend
+from metrics import metrics, trace_latencies
+from pipeline import Pipeline
+from question_detector import QuestionDetector
+from stt_engine import create_stt_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV files through the full assistant pipeline.")
+    parser.add_argument("wavs", nargs="+")
+    parser.add_argument("--mic", nargs="+", help="Microphone-side WAVs replayed alongside (your own speech)")
+    parser.add_argument("--fast", action="store_true", help="Feed audio as fast as possible instead of real time")
+    parser.add_argument("--llm", choices=BACKENDS, default="stub")
+    parser.add_argument("--profile", help="Profile JSON for the LLM persona")
+    parser.add_argument("--stt-profile", help="STT decoding profile (default: STT_PROFILE or balanced)")
+    parser.add_argument("--no-streaming", action="store_true", help="Disable partial transcription")
+    parser.add_argument("--speculative", action="store_true", help="Start answers from partial transcripts")
+    parser.add_argument("--debounce", type=float, default=0.0, help="Seconds to wait for follow-up fragments of a question")
+    parser.add_argument("--trace", help="Append one JSON line per utterance to this file")
+    parser.add_argument("--metrics-jsonl", help="Stream every timing span to this JSONL file")
+    parser.add_argument("--chrome-trace", help="Write all timing spans as a Chrome trace file")
+    args = parser.parse_args()
+
+    if args.metrics_jsonl:
+        metrics.enable_jsonl(args.metrics_jsonl)
+    if args.chrome_trace:
+        metrics.enable_chrome_trace(args.chrome_trace)
+
+    profile_data = None
+    if args.profile:
+        with open(args.profile, "r") as f:
+            profile_data = json.load(f)
+
+    ai_engine = AIEngine(profile_data, backend=create_backend(args.llm))
+
+    stt_engine = create_stt_engine(args.stt_profile)
+    streaming = not args.no_streaming
+    capture = FileAudioCapture(args.wavs, realtime=not args.fast, mic_paths=args.mic,
+                               partial_interval=0.5 if streaming else None)
+
+    traces = []
+    trace_file = open(args.trace, "a", encoding="utf-8") if args.trace else None
+
+    def on_trace(trace):
+        spans = trace_latencies(trace)
+        traces.append(spans)
+        summary = " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in spans.items())
+        print(f"[trace] {trace.get('transcript', '')[:60]!r} {summary}")
+        if trace_file:
+            trace_file.write(json.dumps({"transcript": trace.get("transcript", ""), "source": trace.get("source"),
+                                         "audio_s": trace.get("duration"),
+                                         "latency_s": spans}) + "\n")
+            trace_file.flush()
+
+    pipeline = Pipeline(
+        capture, stt_engine, ai_engine,
+        streaming=streaming,
+        speculative=args.speculative,
+        question_detector=QuestionDetector(debounce=args.debounce),
+        on_suggestion=lambda text: print(f"[answer] {text}", end="", flush=True),
+        on_suggestion_chunk=lambda text: print(text, end="", flush=True),
+        on_answer=lambda question, answer, traces: print(),
+        on_trace=on_trace,
+    )
+
+    start = time.perf_counter()
+    pipeline.start()
+    try:
+        # Wait for the files to run out and everything queued to be answered
+        while not (capture.finished.is_set() and pipeline.is_idle()):
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    pipeline.stop()
+    metrics.close()
+    if trace_file:
+        trace_file.close()
+
+    print(f"\nReplayed {len(args.wavs)} file(s) in {time.perf_counter() - start:.1f}s, {len(traces)} utterance(s).")
+    names = sorted({name for spans in traces for name in spans})
+    for name in names:
+        values = [spans[name] for spans in traces if name in spans]
+        print(f"  {name:<28s} p50={np.percentile(values, 50) * 1000:7.0f}ms "
+              f"p95={np.percentile(values, 95) * 1000:7.0f}ms  (n={len(values)})")
+    rate = metrics.rate("speculation_hit", "speculation_miss")
+    if rate is not None:
+        print(f"  speculation hit rate: {rate * 100:.0f}% "
+              f"({metrics.counter('speculation_hit')} hit, {metrics.counter('speculation_miss')} miss)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
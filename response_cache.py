@@ -0,0 +1,193 @@
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+CACHE_DIR = "cache"
+
+# Words that don't change what is being asked ("Oh, hey, hi. Now tell me about yourself.")
+FILLER_WORDS = {
+    "oh", "hey", "hi", "hello", "ok", "okay", "so", "now", "um", "uh", "well", "right",
+    "please", "just", "actually", "basically", "like", "yeah", "alright",
+}
+
+
+def singularize(word):
+    """Crude singular: "yourselves" -> "yourself", "tuples" -> "tuple"; "class" stays."""
+    if word.endswith("selves"):
+        return word[:-3] + "f"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_question(text):
+    """Lowercase, strip punctuation and filler words, and crudely singularize."""
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    return " ".join(singularize(w) for w in words if w not in FILLER_WORDS)
+
+
+# Function words and request phrasing ("can you tell me about ..."). Question words
+# (what / why / how) are not here: "what is X" and "why X" need different answers.
+QUESTION_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "with", "from", "by", "about",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those", "there",
+    "i", "you", "we", "me", "my", "your", "our", "u", "can", "could", "would", "will", "do", "doe", "did",
+    "tell", "explain", "describe", "give", "walk", "through", "some", "any", "vs", "versus", "between",
+    "bit", "little", "more", "kind", "sort", "let", "know", "talk",
+    # Contraction tails left by stripping the apostrophe ("what's" -> "what s"); "t" (don't) stays
+    "s", "re", "ll", "ve", "m", "d",
+}
+
+
+# A leading question word may be left out ("Difference between list and tuple?")
+WH_WORDS = ("what", "why", "how", "when", "where", "which", "who")
+
+
+def question_key(text):
+    """
+    Content words of a question, in order: normalize_question() minus QUESTION_STOPWORDS.
+    Two questions are the same cache entry only if their keys are equal, so a differing
+    noun, identifier or language ("list vs tuple" / "list vs set") is always a miss.
+    """
+    return " ".join(w for w in normalize_question(text).split() if w not in QUESTION_STOPWORDS)
+
+
+def profile_hash(profile_data):
+    """Answers are only valid for the persona they were generated for."""
+    return hashlib.sha1(json.dumps(profile_data or {}, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+class ResponseCache:
+    """
+    Local answer cache for repeated questions, one file per profile.
+
+    Keys are question_key() of the question text, so rewordings that keep the same
+    content words ("Can you tell me about yourself?" / "So tell me about yourself.")
+    hit, and any question that differs in a content word misses. The one exception is
+    a leading question word that only one side has ("What is the difference between
+    a list and a tuple?" / "Difference between list and tuple?").
+    Entries are evicted LRU beyond max_entries and expire after ttl seconds.
+    """
+    def __init__(self, profile_data=None, profile_filename=None, max_entries=200,
+                 ttl=7 * 24 * 3600, cache_dir=CACHE_DIR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.profile_hash = profile_hash(profile_data)
+        self.entries = collections.OrderedDict()  # question_key -> {"answer", "question", "created"}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshing = set()
+
+        self.path = None
+        if profile_filename:
+            base_name = profile_filename.replace(".json", "")
+            self.path = os.path.join(cache_dir, f"{base_name}_answers.json")
+            self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("profile_hash") != self.profile_hash:
+                print("Profile changed since answers were cached, starting with an empty cache.")
+                return
+            now = time.time()
+            for _, entry in data.get("entries", []):
+                # Re-keyed from the question, so files from older key schemes still load
+                key = question_key(entry["question"])
+                if key and now - entry["created"] < self.ttl:
+                    self.entries[key] = entry
+            print(f"Loaded {len(self.entries)} cached answers.")
+        except Exception as e:
+            print(f"Failed to load answer cache: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {"profile_hash": self.profile_hash, "entries": list(self.entries.items())}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save answer cache: {e}")
+
+    def get(self, question, touch=True):
+        """
+        Return the cached answer for `question` (or a rewording with the same content words), else None.
+        touch=False only peeks: no hit/miss counting and no LRU update.
+        """
+        key = question_key(question)
+        if not key:
+            return None
+        now = time.time()
+        with self.lock:
+            key = self._find(key)
+            entry = self.entries.get(key)
+            if entry is not None and now - entry["created"] >= self.ttl:
+                del self.entries[key]
+                entry = None
+
+            if not touch:
+                return entry["answer"] if entry is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["answer"]
+
+    def _find(self, key):
+        """Stored key for `key`: itself, or the same content words with/without one leading question word."""
+        if key in self.entries:
+            return key
+        first, _, rest = key.partition(" ")
+        if first in WH_WORDS:
+            return rest if rest in self.entries else None
+        # "difference list tuple" matches "what difference list tuple", unless "why ..." is stored too
+        found = [w + " " + key for w in WH_WORDS if w + " " + key in self.entries]
+        return found[0] if len(found) == 1 else None
+
+    def put(self, question, answer):
+        key = question_key(question)
+        if not key or not answer:
+            return
+        with self.lock:
+            self.entries[key] = {"question": question.strip(), "answer": answer, "created": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        self.save()
+
+    def refresh(self, question, generate):
+        """Regenerate the answer for `question` in the background with generate(question)."""
+        key = question_key(question)
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def run():
+            try:
+                answer = generate(question)
+                if answer:
+                    self.put(question, answer)
+            except Exception as e:
+                print(f"Background answer refresh failed: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        thread = threading.Thread(target=run, name="cache-refresh")
+        thread.daemon = True
+        thread.start()
@@ -0,0 +1,62 @@
+import numpy as np
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity float32 ring buffer for mono audio.
+
+    Every sample is stored twice (at i and i + capacity), so any span of up to
+    `capacity` samples is contiguous and can be handed out as a numpy view
+    without copying. Positions are absolute sample counts since start, so a
+    reader can tell whether the span it holds has been overwritten yet.
+    """
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self.write_pos = 0
+
+    def _slots(self, n):
+        """Yield (ring_index, offset, count) pieces for the next n samples, split at the wrap point."""
+        offset = 0
+        while offset < n:
+            i = (self.write_pos + offset) % self.capacity
+            count = min(n - offset, self.capacity - i)
+            yield i, offset, count
+            offset += count
+
+    def write(self, samples):
+        """Append mono samples."""
+        n = len(samples)
+        for i, offset, count in self._slots(n):
+            chunk = samples[offset:offset + count]
+            self.data[i:i + count] = chunk
+            self.data[i + self.capacity:i + self.capacity + count] = chunk
+        self.write_pos += n
+        return self.write_pos
+
+    def write_downmix(self, block):
+        """Append a (frames, channels) block, averaging channels straight into the buffer."""
+        if block.ndim == 1 or block.shape[1] == 1:
+            return self.write(block.reshape(-1))
+        n = block.shape[0]
+        for i, offset, count in self._slots(n):
+            dst = self.data[i:i + count]
+            np.mean(block[offset:offset + count], axis=1, out=dst)
+            self.data[i + self.capacity:i + self.capacity + count] = dst
+        self.write_pos += n
+        return self.write_pos
+
+    def is_valid(self, start):
+        """True while samples from absolute position `start` have not been overwritten."""
+        return start >= self.write_pos - self.capacity
+
+    def view(self, start, end=None):
+        """
+        Zero-copy view of samples [start, end) (absolute positions).
+        The view stays valid until `capacity` more samples have been written.
+        """
+        if end is None:
+            end = self.write_pos
+        if not self.is_valid(start) or end > self.write_pos or end < start:
+            raise ValueError(f"Span [{start}, {end}) is not in the buffer")
+        i = start % self.capacity
+        return self.data[i:i + (end - start)]
@@ -2,9 +2,12 @@ import mss
 import numpy as np
 from PIL import Image
 
+from image_prep import ImagePrep
+
 class ScreenCapture:
     def __init__(self):
         self.sct = mss.mss()
+        self.prep = None
 
     def capture_screen(self):
         """Capture the primary screen and return a PIL Image."""
@@ -16,6 +19,21 @@ class ScreenCapture:
         img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
         return img
 
+    def capture_payload(self, roi=None, monitor_index=1):
+        """
+        Compact encoded screenshot for a multimodal prompt (see image_prep.py), ready to
+        pass as generate_response(image_input=...). The app itself sends OCR'd screen text.
+        roi = (left, top, width, height) within the monitor; only that region is decoded.
+        """
+        if self.prep is None:
+            self.prep = ImagePrep()
+        sct_img = self.sct.grab(self.sct.monitors[monitor_index])
+        return self.prep.prepare_bgra(sct_img.raw, sct_img.size, roi)
+
+    def grab_array(self, monitor_index=1):
+        """Screen as a (height, width, 4) BGRA uint8 array, without converting to PIL."""
+        return np.asarray(self.sct.grab(self.sct.monitors[monitor_index]))
+
     def capture_region(self, top, left, width, height):
         """Capture a specific region."""
         monitor = {"top": top, "left": left, "width": width, "height": height}
@@ -0,0 +1,193 @@
+"""
+Screen text as prompt context.
+
+Sends a few hundred tokens of on-screen text (shared code, a question in the
+meeting chat) with each question instead of a full-resolution screenshot.
+A background thread samples the screen every `interval` seconds:
+
+1. The frame is downscaled (every 2nd pixel, one channel) and hashed; an identical
+   hash means nothing changed and the frame is skipped.
+2. Otherwise it is diffed against a reference frame in horizontal strips. Strips
+   with enough changed pixels form bands; small flicker (a blinking caret) never
+   reaches the threshold.
+3. Only the changed bands are OCR'd (pytesseract, full width so lines aren't cut),
+   widened so they never cut through a line that is already known.
+
+The result is a per-line text snapshot; text() renders it within max_tokens,
+keeping the most recently changed lines first.
+
+Needs pytesseract and the Tesseract binary (https://github.com/tesseract-ocr/tesseract).
+"""
+import hashlib
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from conversation_memory import estimate_tokens
+from metrics import metrics
+from screen_capture import ScreenCapture
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+SCREEN_TOKENS = 300      # screen text attached per question
+SAMPLE_INTERVAL = 1.0    # seconds between screen samples
+DOWNSCALE = 2            # diff every Nth pixel in both directions
+STRIP_HEIGHT = 32        # full-resolution pixels per diff strip
+PIXEL_DELTA = 24         # grey-level change that counts as a changed pixel
+MIN_CHANGED_PIXELS = 24  # per strip (downscaled); a caret blink is ~10
+BAND_MARGIN = 6          # pixels added above/below each OCR band
+MIN_WORD_CONFIDENCE = 30
+
+
+class ScreenContext:
+    """
+    Background screen sampler keeping an OCR'd text snapshot of what is on screen.
+    sample() can also be called directly with BGRA frames (tests, benchmarks).
+    """
+    def __init__(self, interval=SAMPLE_INTERVAL, max_tokens=SCREEN_TOKENS, monitor=1, lang="eng"):
+        if pytesseract is None:
+            raise RuntimeError("pytesseract is not installed (pip install pytesseract, plus the Tesseract binary).")
+        self.interval = interval
+        self.max_tokens = max_tokens
+        self.monitor = monitor
+        self.lang = lang
+        self.lock = threading.Lock()
+        self.lines = []  # {"top", "bottom", "left", "text", "changed"}
+        self.last_digest = None
+        self.reference = None
+        self.last_sample = 0.0
+        self.frames = 0
+        self.skipped = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="screen-context")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+
+    def _run(self):
+        # mss handles belong to the thread that created them
+        capture = ScreenCapture()
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sample(capture.grab_array(self.monitor))
+            except pytesseract.TesseractNotFoundError:
+                print("Tesseract binary not found, screen context disabled.")
+                return
+            except Exception as e:
+                print(f"Screen context error: {e}")
+
+    def sample(self, frame):
+        """Process one (height, width, 4) BGRA frame. Returns the number of bands OCR'd."""
+        self.frames += 1
+        self.last_sample = time.time()
+        small = np.ascontiguousarray(frame[::DOWNSCALE, ::DOWNSCALE, 1])
+        digest = hashlib.blake2b(small.tobytes(), digest_size=16).digest()
+        if digest == self.last_digest:
+            self.skipped += 1
+            metrics.increment("screen_frames_unchanged")
+            return 0
+        self.last_digest = digest
+
+        if self.reference is None or self.reference.shape != small.shape:
+            bands = [(0, frame.shape[0])]
+            self.reference = small
+            with self.lock:
+                self.lines = []
+        else:
+            bands = self._changed_bands(small, frame.shape[0])
+        for top, bottom in bands:
+            self._ocr_band(frame, top, bottom)
+            # Only OCR'd strips move the reference, so slow edits add up until they count
+            self.reference[top // DOWNSCALE:bottom // DOWNSCALE] = small[top // DOWNSCALE:bottom // DOWNSCALE]
+        if not bands:
+            self.skipped += 1
+        return len(bands)
+
+    def _changed_bands(self, small, height):
+        """[(top, bottom)] full-resolution row ranges with enough changed pixels, adjacent strips merged."""
+        changed = np.abs(small.astype(np.int16) - self.reference) > PIXEL_DELTA
+        per_row = changed.sum(axis=1)
+        rows = STRIP_HEIGHT // DOWNSCALE
+        strips = np.add.reduceat(per_row, np.arange(0, len(per_row), rows))
+        bands = []
+        for i in np.flatnonzero(strips >= MIN_CHANGED_PIXELS):
+            top, bottom = i * STRIP_HEIGHT, min(height, (i + 1) * STRIP_HEIGHT)
+            if bands and bands[-1][1] >= top:
+                bands[-1] = (bands[-1][0], bottom)
+            else:
+                bands.append((top, bottom))
+        return bands
+
+    def _ocr_band(self, frame, top, bottom):
+        top = max(0, top - BAND_MARGIN)
+        bottom = min(frame.shape[0], bottom + BAND_MARGIN)
+        with self.lock:
+            # Never cut through a line that is already known
+            for line in self.lines:
+                if line["top"] < top < line["bottom"]:
+                    top = line["top"]
+                if line["top"] < bottom < line["bottom"]:
+                    bottom = line["bottom"]
+
+        # Brightest channel keeps coloured text on dark editor themes legible
+        crop = Image.fromarray(np.ascontiguousarray(frame[top:bottom, :, :3].max(axis=2)))
+        with metrics.span("screen_ocr", rows=bottom - top):
+            data = pytesseract.image_to_data(crop, lang=self.lang, output_type=pytesseract.Output.DICT)
+        found = {}
+        for i, word in enumerate(data["text"]):
+            word = word.strip()
+            if not word or float(data["conf"][i]) < MIN_WORD_CONFIDENCE:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            line = found.setdefault(key, {"top": top + data["top"][i], "bottom": top + data["top"][i] + data["height"][i],
+                                          "left": data["left"][i], "words": []})
+            line["top"] = min(line["top"], top + data["top"][i])
+            line["bottom"] = max(line["bottom"], top + data["top"][i] + data["height"][i])
+            line["left"] = min(line["left"], data["left"][i])
+            line["words"].append(word)
+
+        now = time.time()
+        new_lines = [{"top": l["top"], "bottom": l["bottom"], "left": l["left"], "text": " ".join(l["words"]),
+                      "changed": now} for l in found.values()]
+        with self.lock:
+            kept = [l for l in self.lines if not top <= (l["top"] + l["bottom"]) / 2 < bottom]
+            self.lines = kept + new_lines
+
+    def text(self, max_tokens=None, max_age=None):
+        """On-screen text within max_tokens, most recently changed lines first, rendered top to bottom."""
+        max_tokens = max_tokens or self.max_tokens
+        max_age = max_age if max_age is not None else max(10.0, 10 * self.interval)
+        if time.time() - self.last_sample > max_age:
+            # Sampling stopped; stale text would be misleading
+            return ""
+        with self.lock:
+            lines = sorted(self.lines, key=lambda l: -l["changed"])
+        chosen = []
+        budget = max_tokens
+        for line in lines:
+            cost = estimate_tokens(line["text"]) + 1
+            if cost > budget:
+                continue
+            chosen.append(line)
+            budget -= cost
+        chosen.sort(key=lambda l: (l["top"], l["left"]))
+        return "\n".join(l["text"] for l in chosen)
+
+    def stats(self):
+        with self.lock:
+            lines = len(self.lines)
+        return {"frames": self.frames, "skipped": self.skipped, "lines": lines}
@@ -0,0 +1,399 @@
+"""
+Local full-text search over past transcripts and saved profiles.
+
+Everything under transcripts/ and profiles/ is indexed into one SQLite FTS5
+database (cache/search_index.db). Indexing is incremental:
+
+- JSONL transcripts are append-only, so only the bytes past the last indexed
+  offset are read. TranscriptSink calls index_file() after every batch it writes.
+- Legacy .txt transcripts and profiles are re-indexed only when their size or
+  mtime changes. The app keeps appending to a session's .txt, so it can hold Q&As
+  from before the JSONL log existed next to ones the .jsonl already has; only the
+  records missing from the .jsonl are indexed from the .txt.
+- The profile list is served from the index and only rescans profiles/ when the
+  directory's mtime changes.
+
+Queries are plain words by default (every word except common stopwords must
+match, the last one as a prefix) and ranked by bm25; pass raw=True to use FTS5
+query syntax (a malformed raw query raises ValueError).
+
+Usage:
+    python search_index.py "kubernetes rollout" [--limit 10] [--kind qa|profile] [--session NAME]
+    python search_index.py --rebuild
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+INDEX_PATH = os.path.join("cache", "search_index.db")
+TRANSCRIPT_DIR = "transcripts"
+PROFILE_DIR = "profiles"
+
+# Profile fields that go into the searchable body
+PROFILE_FIELDS = ("intro", "company", "skills", "projects")
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "with", "is", "are", "was", "were",
+    "be", "it", "this", "that", "i", "you", "we", "my", "your", "me", "what", "how", "why", "do", "does",
+}
+
+TXT_LINE = re.compile(r"^\[(\d\d:\d\d:\d\d)\] ([QA]): ?(.*)$")
+TXT_SEPARATOR = "-" * 40
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    filename TEXT PRIMARY KEY,
+    name TEXT,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    title, body,
+    kind UNINDEXED, path UNINDEXED, session UNINDEXED, time UNINDEXED, model UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def session_name(path):
+    """transcripts/Name_2025-11-28_transcript.jsonl -> Name_2025-11-28"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    return base[:-len("_transcript")] if base.endswith("_transcript") else base
+
+
+def parse_txt(text):
+    """Q&A records from the classic .txt transcript (answers may span several lines)."""
+    records = []
+    current = None
+    field = None
+    for line in text.splitlines():
+        if line == TXT_SEPARATOR:
+            if current:
+                records.append(current)
+            current, field = None, None
+            continue
+        match = TXT_LINE.match(line)
+        if match and (match.group(2) == "Q" or current is not None):
+            if match.group(2) == "Q":
+                if current:
+                    records.append(current)
+                current = {"time": match.group(1), "question": "", "answer": ""}
+            field = "question" if match.group(2) == "Q" else "answer"
+            current[field] = match.group(3).strip()
+        elif current is not None and field:
+            current[field] = (current[field] + "\n" + line).strip()
+    if current:
+        records.append(current)
+    return records
+
+
+def record_key(record):
+    """(question, answer) with whitespace normalized, to match .txt records against .jsonl ones."""
+    return (" ".join((record.get("question") or "").split()), " ".join((record.get("answer") or "").split()))
+
+
+def jsonl_keys(path):
+    """record_key of every record in a JSONL transcript (empty if there is none)."""
+    keys = set()
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                try:
+                    keys.add(record_key(json.loads(line)))
+                except ValueError:
+                    pass
+    except OSError:
+        pass
+    return keys
+
+
+def fts_query(text):
+    """Plain words -> FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", text.lower())
+    # Words in nearly every answer don't narrow anything down but make bm25 score every row
+    words = [w for w in words if w not in STOPWORDS] or words
+    if not words:
+        return None
+    terms = ['"' + w + '"' for w in words]
+    if len(words[-1]) >= 3:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index of transcripts and profiles. One connection shared between
+    threads (the transcript sink indexes from its own thread), guarded by a lock.
+    """
+    def __init__(self, path=INDEX_PATH, transcript_dir=TRANSCRIPT_DIR, profile_dir=PROFILE_DIR):
+        self.path = path
+        self.transcript_dir = transcript_dir
+        self.profile_dir = profile_dir
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            self.conn.close()
+            raise RuntimeError(f"SQLite FTS5 is not available: {e}")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # --- Transcripts ---
+
+    def sync(self):
+        """Index whatever changed under the transcript and profile directories. Returns new Q&A count."""
+        added = 0
+        if os.path.isdir(self.transcript_dir):
+            names = set(os.listdir(self.transcript_dir))
+            for name in sorted(names):
+                if name.endswith(".jsonl") or name.endswith(".txt"):
+                    added += self.index_file(os.path.join(self.transcript_dir, name))
+        self._sync_profiles(force=True)
+        return added
+
+    def index_file(self, path):
+        """Bring one transcript file up to date in the index. Returns the number of Q&As added."""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 0
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime, offset FROM files WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                return 0
+            if not path.endswith(".jsonl"):
+                return self._index_txt(path, stat)
+            added = self._index_jsonl(path, stat, row)
+            sibling = path[:-len(".jsonl")] + ".txt"
+            if added and os.path.exists(sibling):
+                # Records now in the .jsonl must not stay indexed twice through the .txt
+                added -= self._index_txt(sibling, os.stat(sibling), reindex=True)
+            return added
+
+    def _index_jsonl(self, path, stat, row):
+        offset = row[2] if row else 0
+        with self.conn:
+            if offset > stat.st_size:
+                # Truncated or replaced: start over
+                self._delete_path(path)
+                offset = 0
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            # Only whole lines; a line still being written is picked up next time
+            end = data.rfind(b"\n") + 1
+            records = []
+            for line in data[:end].decode("utf-8", errors="replace").splitlines():
+                if line.strip():
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        print(f"Skipping unreadable line in {path}")
+            self._insert_records(path, records)
+            self._save_file(path, "jsonl", stat, offset + end)
+        return len(records)
+
+    def _index_txt(self, path, stat, reindex=False):
+        """
+        Index the records of a .txt that its .jsonl doesn't have. Returns the change in
+        indexed Q&As (with reindex=True, how many were dropped as now covered by the .jsonl).
+        """
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            records = parse_txt(f.read())
+        covered = jsonl_keys(path[:-len(".txt")] + ".jsonl")
+        records = [r for r in records if record_key(r) not in covered]
+        with self.conn:
+            before = self.conn.execute("SELECT count(*) FROM docs WHERE path = ?", (path,)).fetchone()[0]
+            self._delete_path(path)
+            self._insert_records(path, records)
+            self._save_file(path, "txt", stat, stat.st_size)
+        return before - len(records) if reindex else len(records)
+
+    def _insert_records(self, path, records):
+        session = session_name(path)
+        self.conn.executemany(
+            "INSERT INTO docs (title, body, kind, path, session, time, model) VALUES (?, ?, 'qa', ?, ?, ?, ?)",
+            [(r.get("question", ""), r.get("answer", ""), path, session, r.get("time", ""), r.get("model"))
+             for r in records])
+
+    def _save_file(self, path, kind, stat, offset):
+        self.conn.execute("INSERT OR REPLACE INTO files (path, kind, size, mtime, offset) VALUES (?, ?, ?, ?, ?)",
+                          (path, kind, stat.st_size, stat.st_mtime, offset))
+
+    def _delete_path(self, path):
+        self.conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    # --- Profiles ---
+
+    def list_profiles(self):
+        """Saved profile filenames, rescanning profiles/ only when the directory changed."""
+        self._sync_profiles()
+        with self.lock:
+            return [r[0] for r in self.conn.execute("SELECT filename FROM profiles ORDER BY filename")]
+
+    def index_profile(self, filename, data):
+        """Index a profile that was just saved (its file already written)."""
+        path = os.path.abspath(os.path.join(self.profile_dir, filename))
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = time.time()
+        with self.lock, self.conn:
+            self._store_profile(filename, path, data, mtime)
+
+    def _store_profile(self, filename, path, data, mtime):
+        self.conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+        body = "\n".join(str(data.get(field, "")) for field in PROFILE_FIELDS)
+        self.conn.execute(
+            "INSERT INTO docs (title, body, kind, path, session, time, model) VALUES (?, ?, 'profile', ?, ?, '', NULL)",
+            (data.get("name", ""), body, path, filename[:-len(".json")]))
+        self.conn.execute("INSERT OR REPLACE INTO profiles (filename, name, mtime) VALUES (?, ?, ?)",
+                          (filename, data.get("name", ""), mtime))
+
+    def _sync_profiles(self, force=False):
+        try:
+            dir_mtime = os.stat(self.profile_dir).st_mtime
+        except OSError:
+            return
+        with self.lock:
+            row = self.conn.execute("SELECT mtime FROM dirs WHERE path = ?", (self.profile_dir,)).fetchone()
+            if row and row[0] == dir_mtime and not force:
+                return
+            known = dict(self.conn.execute("SELECT filename, mtime FROM profiles"))
+            with self.conn:
+                present = set()
+                for filename in os.listdir(self.profile_dir):
+                    if not filename.endswith(".json"):
+                        continue
+                    path = os.path.abspath(os.path.join(self.profile_dir, filename))
+                    present.add(filename)
+                    mtime = os.stat(path).st_mtime
+                    if known.get(filename) == mtime:
+                        continue
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                    except Exception as e:
+                        print(f"Skipping unreadable profile {filename}: {e}")
+                        data = {}
+                    self._store_profile(filename, path, data, mtime)
+                for filename in set(known) - present:
+                    self.conn.execute("DELETE FROM profiles WHERE filename = ?", (filename,))
+                    self.conn.execute("DELETE FROM docs WHERE path = ?", (os.path.abspath(os.path.join(self.profile_dir, filename)),))
+                self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime) VALUES (?, ?)",
+                                  (self.profile_dir, dir_mtime))
+
+    # --- Queries ---
+
+    def search(self, query, limit=20, kind=None, session=None, raw=False):
+        """Best matches first, as dicts with kind, session, time, question/title, answer snippet and path."""
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+        # FTS5 sorts by rank itself; snippets are only built for the rows returned
+        sql = ("SELECT kind, session, time, model, title, snippet(docs, 1, '[', ']', '...', 24), path, rank "
+               "FROM docs WHERE docs MATCH ? AND rank MATCH 'bm25(2.0, 1.0)'")
+        params = [match]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if session:
+            sql += " AND session = ?"
+            params.append(session)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                if not raw:
+                    raise
+                raise ValueError(f"Invalid FTS5 query {query!r}: {e}")
+        return [{"kind": r[0], "session": r[1], "time": r[2], "model": r[3], "title": r[4],
+                 "snippet": r[5], "path": r[6], "score": -r[7]} for r in rows]
+
+    def stats(self):
+        with self.lock:
+            qa = self.conn.execute("SELECT count(*) FROM docs WHERE kind = 'qa'").fetchone()[0]
+            sessions = self.conn.execute("SELECT count(*) FROM files").fetchone()[0]
+            profiles = self.conn.execute("SELECT count(*) FROM profiles").fetchone()[0]
+        return {"qa": qa, "transcript_files": sessions, "profiles": profiles}
+
+    def rebuild(self):
+        """Drop everything and index from scratch."""
+        with self.lock, self.conn:
+            for table in ("docs", "files", "profiles", "dirs"):
+                self.conn.execute(f"DELETE FROM {table}")
+        return self.sync()
+
+
+def list_profiles(profile_dir=PROFILE_DIR, index=None):
+    """Profile filenames from the index, or a plain directory listing if SQLite/FTS5 is unavailable."""
+    try:
+        index = index or SearchIndex(profile_dir=profile_dir)
+        return index.list_profiles()
+    except Exception as e:
+        print(f"Search index unavailable, listing {profile_dir}/ directly: {e}")
+        return sorted(f for f in os.listdir(profile_dir) if f.endswith(".json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search past interview transcripts and profiles.")
+    parser.add_argument("query", nargs="?", help="Words to search for")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--kind", choices=["qa", "profile"], help="Only Q&As or only profiles")
+    parser.add_argument("--session", help="Only this session, e.g. Name_2025-11-28")
+    parser.add_argument("--raw", action="store_true", help="Pass the query to FTS5 as-is (AND/OR/NEAR, \"phrases\")")
+    parser.add_argument("--index", default=INDEX_PATH, help="Index database path")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index everything from scratch")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    start = time.perf_counter()
+    added = index.rebuild() if args.rebuild else index.sync()
+    if added or args.rebuild:
+        print(f"Indexed {added} Q&As in {(time.perf_counter() - start) * 1000:.0f} ms ({index.stats()})")
+    if not args.query:
+        return
+
+    start = time.perf_counter()
+    try:
+        results = index.search(args.query, limit=args.limit, kind=args.kind, session=args.session, raw=args.raw)
+    except ValueError as e:
+        print(f"{e}\nSee https://www.sqlite.org/fts5.html#full_text_query_syntax, or drop --raw for plain words.")
+        sys.exit(2)
+    elapsed = (time.perf_counter() - start) * 1000
+    for r in results:
+        if r["kind"] == "profile":
+            print(f"[profile] {r['session']}: {r['title']}\n    {r['snippet']}")
+        else:
+            print(f"[{r['session']} {r['time']}] Q: {r['title']}\n    A: {r['snippet']}")
+    print(f"{len(results)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,378 @@
-from faster_whisper import WhisperModel
+from dotenv import load_dotenv
+from metrics import metrics
 import numpy as np
+import json
 import os
+import platform
+import re
+import threading
+import time
+
+# Load environment variables (STT_PROFILE)
+load_dotenv()
+
+HALLUCINATIONS = ["You", "Thank you", "Thanks", "Subtitle by", "Amara.org", "MBC", "Copyright"]
+
+# Named decoding profiles, from lowest latency to highest accuracy.
+# cpu_threads=0 lets CTranslate2 pick; temperature is the fallback schedule
+# used when a decode looks like a failure (high compression ratio / low log-prob).
+STT_PROFILES = {
+    "fastest": {"model_size": "tiny", "compute_type": "int8", "beam_size": 1,
+                "temperature": [0.0], "cpu_threads": 0, "num_workers": 1},
+    "fast": {"model_size": "base", "compute_type": "int8", "beam_size": 1,
+             "temperature": [0.0, 0.4], "cpu_threads": 0, "num_workers": 1},
+    "balanced": {"model_size": "base", "compute_type": "int8", "beam_size": 5,
+                 "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0], "cpu_threads": 0, "num_workers": 1},
+    "accurate": {"model_size": "small", "compute_type": "int8", "beam_size": 5,
+                 "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0], "cpu_threads": 0, "num_workers": 1},
+}
+DEFAULT_PROFILE = "balanced"
+
+# Auto mode picks the most accurate profile whose real-time factor stays under this
+AUTO_TARGET_RTF = 0.3
+AUTO_CACHE_FILE = os.path.join("cache", "stt_auto_profile.json")
+# Auto mode starts here until it has measured real speech on this machine
+AUTO_START_PROFILE = DEFAULT_PROFILE
+# Seconds of real phrases decoded before auto mode judges the current profile
+AUTO_CALIBRATION_SECONDS = 20
+# Least to most accurate, with rough decode cost relative to "balanced" (used to estimate a step up)
+AUTO_ORDER = ["fastest", "fast", "balanced", "accurate"]
+PROFILE_COST = {"fastest": 0.2, "fast": 0.4, "balanced": 1.0, "accurate": 3.0}
 
 class STTEngine:
-    def __init__(self, model_size="small"):
-        print(f"Loading Faster-Whisper model: {model_size}...")
+    def __init__(self, model_size=None, profile=DEFAULT_PROFILE, **overrides):
+        """
+        profile: name from STT_PROFILES; any profile key can be overridden by keyword.
+        model_size: shortcut for overriding the profile's model.
+        """
+        if profile not in STT_PROFILES:
+            print(f"Unknown STT profile '{profile}', using '{DEFAULT_PROFILE}'.")
+            profile = DEFAULT_PROFILE
+        self.profile_name = profile
+        self.profile = dict(STT_PROFILES[profile], **overrides)
+        if model_size:
+            self.profile["model_size"] = model_size
+
+        # Imported here so a process that only talks to the STT worker never loads CTranslate2
+        from faster_whisper import WhisperModel
+
+        model_size = self.profile["model_size"]
+        print(f"Loading Faster-Whisper model: {model_size} (profile: {profile})...")
         # Run on CPU with INT8 quantization for speed and compatibility
-        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+        self.model = WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=self.profile["compute_type"],
+            cpu_threads=self.profile["cpu_threads"],
+            num_workers=self.profile["num_workers"],
+        )
         print("Faster-Whisper model loaded.")
 
-    def transcribe(self, audio_chunk):
+    def warm_up(self):
+        """Run one dummy inference so the first real phrase doesn't pay for lazy initialisation."""
+        segments, info = self.model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+        # segments is a lazy generator, decoding only happens while iterating
+        for _ in segments:
+            pass
+
+    def _prepare(self, audio_chunk):
+        # Faster-Whisper expects float32 mono audio. AudioCapture already delivers that,
+        # so only convert (and copy) when given something else.
+        if len(audio_chunk.shape) > 1:
+            audio_chunk = audio_chunk.mean(axis=1)
+        return audio_chunk.astype(np.float32, copy=False)
+
+    def _is_hallucination(self, text):
+        if text in HALLUCINATIONS or len(text) < 2:
+            return True
+        # Check for repeated hallucinations (e.g. "You You You")
+        if text.replace(" ", "") in ["You"*i for i in range(1, 10)]:
+            return True
+        return False
+
+    def transcribe(self, audio_chunk, initial_prompt=None):
         """
         Transcribe a numpy array of audio.
         audio_chunk: np.array of shape (N, channels) or (N,)
+        initial_prompt: already transcribed text preceding this audio (optional)
         """
         if audio_chunk is None or len(audio_chunk) == 0:
             return ""
 
-        # Faster-Whisper expects float32 mono audio
-        if len(audio_chunk.shape) > 1:
-            audio_chunk = audio_chunk.mean(axis=1)
-        
-        audio_chunk = audio_chunk.astype(np.float32)
+        audio_chunk = self._prepare(audio_chunk)
 
         # Skip very short chunks
-        if len(audio_chunk) < 16000 * 0.5: 
+        if len(audio_chunk) < 16000 * 0.5:
             return ""
 
         # faster-whisper transcribe expects a file path or a binary file-like object.
         # However, it also accepts a numpy array directly in recent versions.
         # segments, info = model.transcribe(audio_chunk, beam_size=5)
-        
+
         try:
-            segments, info = self.model.transcribe(audio_chunk, beam_size=5)
-            
-            # Collect text from segments
-            text = " ".join([segment.text for segment in segments]).strip()
-            
+            with metrics.span("whisper_transcribe", audio_s=len(audio_chunk) / 16000):
+                segments, info = self.model.transcribe(
+                    audio_chunk,
+                    beam_size=self.profile["beam_size"],
+                    temperature=self.profile["temperature"],
+                    initial_prompt=initial_prompt,
+                )
+
+                # Collect text from segments (decoding happens while iterating)
+                text = " ".join([segment.text for segment in segments]).strip()
+
             # Filter hallucinations
-            hallucinations = ["You", "Thank you", "Thanks", "Subtitle by", "Amara.org", "MBC", "Copyright"]
-            if text in hallucinations or len(text) < 2:
-                return ""
-            
-            # Check for repeated hallucinations (e.g. "You You You")
-            if text.replace(" ", "") in ["You"*i for i in range(1, 10)]:
+            if self._is_hallucination(text):
                 return ""
 
             return text
         except Exception as e:
             print(f"Transcription error: {e}")
             return ""
+
+    def transcribe_words(self, audio_chunk, initial_prompt=None):
+        """
+        Fast greedy pass used for partial hypotheses.
+        Returns a list of (start, end, word) tuples, times in seconds relative to the chunk.
+        """
+        if audio_chunk is None or len(audio_chunk) == 0:
+            return []
+
+        audio_chunk = self._prepare(audio_chunk)
+
+        try:
+            with metrics.span("whisper_partial", audio_s=len(audio_chunk) / 16000):
+                segments, info = self.model.transcribe(
+                    audio_chunk,
+                    beam_size=1,
+                    word_timestamps=True,
+                    condition_on_previous_text=False,
+                    initial_prompt=initial_prompt,
+                )
+                words = []
+                for segment in segments:
+                    for word in segment.words or []:
+                        words.append((word.start, word.end, word.word.strip()))
+            return [w for w in words if w[2]]
+        except Exception as e:
+            print(f"Partial transcription error: {e}")
+            return []
+
+
+def _machine_key():
+    return f"{platform.machine()}|{platform.processor()}|{os.cpu_count()}"
+
+
+def _load_auto_cache():
+    try:
+        with open(AUTO_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_auto_profile(name):
+    cache = _load_auto_cache()
+    cache[_machine_key()] = name
+    try:
+        os.makedirs(os.path.dirname(AUTO_CACHE_FILE), exist_ok=True)
+        with open(AUTO_CACHE_FILE, "w") as f:
+            json.dump(cache, f, indent=4)
+    except Exception as e:
+        print(f"Could not cache auto STT profile: {e}")
+
+
+class AutoSTTEngine:
+    """
+    STT_PROFILE=auto: the profile is chosen from the real-time factor measured on
+    the first real phrases, not on a synthetic signal (Whisper decodes tones and
+    noise very differently from speech).
+
+    Starts with the profile cached for this machine, or AUTO_START_PROFILE. After
+    AUTO_CALIBRATION_SECONDS of decoded speech it steps down to a faster profile if
+    the current one is too slow; on the first measurement it may instead step up to
+    the most accurate profile whose estimated RTF fits. The new model is loaded in
+    the background and swapped in, so at most one extra model is loaded per step.
+    The choice is cached per machine in cache/.
+    """
+    def __init__(self, target_rtf=AUTO_TARGET_RTF):
+        self.target_rtf = target_rtf
+        cached = _load_auto_cache().get(_machine_key())
+        # A cached choice is only ever stepped down from, never re-estimated upwards
+        self.settled = cached in STT_PROFILES
+        profile = cached if self.settled else AUTO_START_PROFILE
+        print(f"Auto STT profile: starting with {profile}" + (" (cached)" if self.settled else ""))
+        self.engine = STTEngine(profile=profile)
+        self.decode_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.switching = False
+        self.lock = threading.Lock()
+
+    @property
+    def profile_name(self):
+        return self.engine.profile_name
+
+    def warm_up(self):
+        self.engine.warm_up()
+
+    def _is_hallucination(self, text):
+        return self.engine._is_hallucination(text)
+
+    def transcribe(self, audio_chunk, initial_prompt=None):
+        engine = self.engine
+        start = time.perf_counter()
+        text = engine.transcribe(audio_chunk, initial_prompt=initial_prompt)
+        # Chunks under 0.5 s are skipped without decoding, so they say nothing about speed
+        if audio_chunk is not None and len(audio_chunk) >= 16000 * 0.5:
+            self._measure(engine, time.perf_counter() - start, len(audio_chunk) / 16000)
+        return text
+
+    def transcribe_words(self, audio_chunk, initial_prompt=None):
+        # Partial passes are greedy whatever the profile; only full decodes are measured
+        return self.engine.transcribe_words(audio_chunk, initial_prompt=initial_prompt)
+
+    def _measure(self, engine, decode_seconds, audio_seconds):
+        with self.lock:
+            if engine is not self.engine or self.switching:
+                return
+            self.decode_seconds += decode_seconds
+            self.audio_seconds += audio_seconds
+            if self.audio_seconds < AUTO_CALIBRATION_SECONDS:
+                return
+            rtf = self.decode_seconds / self.audio_seconds
+            self.decode_seconds = self.audio_seconds = 0.0
+            current = engine.profile_name
+            chosen = self._choose(current, rtf)
+            print(f"Auto STT profile: {current} RTF={rtf:.2f} on real speech -> {chosen}")
+            self.settled = True
+            _save_auto_profile(chosen)
+            if chosen == current:
+                return
+            self.switching = True
+        thread = threading.Thread(target=self._switch, args=(chosen,), name="stt-auto-switch")
+        thread.daemon = True
+        thread.start()
+
+    def _choose(self, current, rtf):
+        position = AUTO_ORDER.index(current) if current in AUTO_ORDER else AUTO_ORDER.index(DEFAULT_PROFILE)
+        if rtf > self.target_rtf:
+            return AUTO_ORDER[max(0, position - 1)]
+        if self.settled:
+            return current
+        for name in reversed(AUTO_ORDER[position + 1:]):
+            if rtf * PROFILE_COST[name] / PROFILE_COST[current] <= self.target_rtf:
+                return name
+        return current
+
+    def _switch(self, profile):
+        try:
+            engine = STTEngine(profile=profile)
+            engine.warm_up()
+            self.engine = engine
+            print(f"Auto STT profile: switched to {profile}.")
+        except Exception as e:
+            print(f"Auto STT profile: could not load {profile} ({e}), keeping {self.engine.profile_name}.")
+        finally:
+            with self.lock:
+                self.switching = False
+
+
+def create_stt_engine(profile=None, worker=None):
+    """
+    Build the STT engine for the configured profile (STT_PROFILE in .env, or "auto").
+    With worker=True (STT_WORKER=1 in .env) it runs in a separate process (stt_worker.py).
+    """
+    profile = profile or os.getenv("STT_PROFILE", DEFAULT_PROFILE)
+    if worker is None:
+        worker = os.getenv("STT_WORKER", "0") == "1"
+    if worker:
+        from stt_worker import RemoteSTTEngine
+        return RemoteSTTEngine(profile=profile)
+    if profile == "auto":
+        return AutoSTTEngine()
+    return STTEngine(profile=profile)
+
+
+def _normalize_word(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of the utterance that is currently being spoken.
+
+    Every call to update() re-decodes only the audio after the committed prefix.
+    A word is committed once two consecutive hypotheses agree on it (LocalAgreement),
+    so the final pass in finalize() only has to decode the unconfirmed tail.
+    """
+    def __init__(self, stt_engine, sample_rate=16000, min_new_audio=0.3):
+        self.stt_engine = stt_engine
+        self.sample_rate = sample_rate
+        self.min_new_audio = min_new_audio
+        self.reset()
+
+    def reset(self):
+        self.committed = []        # [(start, end, word)] with times relative to utterance start
+        self.committed_until = 0.0 # seconds of audio covered by committed words
+        self.hypothesis = []       # unconfirmed words from the previous pass
+
+    def committed_text(self):
+        return " ".join(w[2] for w in self.committed)
+
+    def tentative_text(self):
+        return " ".join(w[2] for w in self.hypothesis)
+
+    def update(self, audio):
+        """
+        Feed the whole utterance recorded so far.
+        Returns (committed_text, tentative_text).
+        """
+        offset = int(self.committed_until * self.sample_rate)
+        tail = audio[offset:]
+        if len(tail) < self.min_new_audio * self.sample_rate:
+            return self.committed_text(), self.tentative_text()
+
+        prompt = self.committed_text() or None
+        words = [
+            (start + self.committed_until, end + self.committed_until, word)
+            for start, end, word in self.stt_engine.transcribe_words(tail, initial_prompt=prompt)
+        ]
+
+        if self.stt_engine._is_hallucination(" ".join(w[2] for w in words)):
+            words = []
+
+        # Longest common prefix with the previous hypothesis is stable
+        agreed = 0
+        for old, new in zip(self.hypothesis, words):
+            if _normalize_word(old[2]) != _normalize_word(new[2]):
+                break
+            agreed += 1
+
+        if agreed:
+            self.committed.extend(words[:agreed])
+            self.committed_until = words[agreed - 1][1]
+        self.hypothesis = words[agreed:]
+
+        return self.committed_text(), self.tentative_text()
+
+    def finalize(self, audio):
+        """
+        Decode the unconfirmed tail of a finished utterance and return the full text.
+        Resets the transcriber for the next utterance.
+        """
+        committed = self.committed_text()
+        offset = int(self.committed_until * self.sample_rate)
+        tail = audio[offset:]
+
+        tail_text = ""
+        if len(tail) >= 16000 * 0.5:
+            tail_text = self.stt_engine.transcribe(tail, initial_prompt=committed or None)
+        elif self.hypothesis:
+            # Too little audio left for a reliable pass, keep the last hypothesis
+            tail_text = self.tentative_text()
+
+        self.reset()
+        text = (committed + " " + tail_text).strip()
+        if self.stt_engine._is_hallucination(text):
+            return ""
+        return text
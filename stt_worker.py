@@ -0,0 +1,227 @@
+"""
+Whisper in a separate process.
+
+With STT_WORKER=1 the STT engine runs in a dedicated worker process instead of
+in the app: CTranslate2 and its native libraries never load next to PyQt5, and
+decoding doesn't compete with the Qt event loop for the GIL.
+
+RemoteSTTEngine has the STTEngine interface the pipeline uses (transcribe,
+transcribe_words, warm_up):
+
+- Audio goes through one multiprocessing.shared_memory block. The parent copies the
+  phrase into it once; the worker decodes straight from a numpy view of it. Only
+  (op, block name, sample count, prompt) travels over the pipe, never the audio.
+- Results come back over the same multiprocessing Pipe.
+- While waiting, the parent checks the worker is alive. A crashed or hung worker is
+  killed and restarted (the phrase being decoded is lost). After MAX_CRASHES within
+  CRASH_WINDOW seconds it stops restarting and returns empty transcripts.
+"""
+import atexit
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from metrics import metrics
+from stt_engine import STTEngine
+
+SAMPLE_RATE = 16000
+BUFFER_SECONDS = 30       # initial shared block size; grows for longer phrases
+START_TIMEOUT = 600       # model download + load + warm-up
+# A decode taking longer than this is treated as hung
+MIN_DECODE_TIMEOUT = 30
+DECODE_TIMEOUT_RTF = 5    # seconds allowed per second of audio, above the minimum
+MAX_CRASHES = 3
+CRASH_WINDOW = 60.0
+
+
+def _worker_main(conn, profile):
+    """Worker process: load the engine, then decode requests until told to stop or the parent goes away."""
+    from stt_engine import create_stt_engine
+    try:
+        engine = create_stt_engine(profile, worker=False)
+        engine.warm_up()
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", engine.profile_name))
+
+    shm = None
+    while True:
+        try:
+            op, name, samples, prompt = conn.recv()
+        except (EOFError, OSError):
+            break
+        if op == "stop":
+            break
+        if shm is None or shm.name != name:
+            # The parent grew the buffer
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=name)
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+        try:
+            if op == "transcribe":
+                result = engine.transcribe(audio, initial_prompt=prompt)
+            else:
+                result = engine.transcribe_words(audio, initial_prompt=prompt)
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            # The view must be gone before the block can be closed
+            del audio
+    if shm is not None:
+        shm.close()
+
+
+class RemoteSTTEngine:
+    """
+    STTEngine running in a worker process. Calls are serialized (the pipeline's
+    STT worker thread is the only caller) and block until the worker answers.
+    """
+    # Pure text check, shared with the in-process engine (StreamingTranscriber uses it)
+    _is_hallucination = STTEngine._is_hallucination
+
+    def __init__(self, profile=None):
+        self.profile_name = profile
+        # spawn everywhere: forking a process that already runs Qt and audio threads is unsafe
+        self.context = multiprocessing.get_context("spawn")
+        self.lock = threading.Lock()
+        self.shm = None
+        self.buffer = None
+        self.process = None
+        self.conn = None
+        self.ready = False
+        self.failed = False
+        self.crashes = []
+        self.restarts = 0
+        self._allocate(BUFFER_SECONDS * SAMPLE_RATE)
+        self._start()
+        atexit.register(self.close)
+
+    def _allocate(self, samples):
+        """(Re)create the shared audio block with room for `samples` float32 samples."""
+        old = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=samples * 4)
+        self.buffer = np.ndarray((samples,), dtype=np.float32, buffer=self.shm.buf)
+        if old is not None:
+            # The worker switches to the new block on its next request; the old name can go now
+            old.close()
+            old.unlink()
+
+    def _start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main, args=(child_conn, self.profile_name),
+                                            name="stt-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        print(f"STT worker process started (pid {self.process.pid}).")
+
+    def _receive(self, timeout):
+        """Next message from the worker; raises if it died or didn't answer within timeout."""
+        deadline = time.monotonic() + timeout
+        while not self.conn.poll(0.1):
+            if not self.process.is_alive():
+                raise EOFError(f"STT worker exited with code {self.process.exitcode}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"STT worker did not answer within {timeout:.0f}s")
+        try:
+            return self.conn.recv()
+        except EOFError:
+            self.process.join(timeout=1)
+            raise EOFError(f"STT worker exited with code {self.process.exitcode}")
+
+    def _wait_ready(self):
+        status, value = self._receive(START_TIMEOUT)
+        if status != "ready":
+            raise RuntimeError(f"STT worker failed to load the model: {value}")
+        self.profile_name = value
+        self.ready = True
+        print(f"STT worker ready (profile: {value}).")
+
+    def warm_up(self):
+        """Block until the worker has loaded and warmed up its model."""
+        with self.lock:
+            if not self.ready:
+                self._wait_ready()
+
+    def _restart(self, reason):
+        """Kill the worker and start a new one, unless it keeps crashing."""
+        print(f"STT worker failed ({reason}).")
+        metrics.increment("stt_worker_crashes")
+        self._kill()
+        now = time.monotonic()
+        self.crashes = [t for t in self.crashes if now - t < CRASH_WINDOW] + [now]
+        if len(self.crashes) >= MAX_CRASHES:
+            print(f"STT worker crashed {len(self.crashes)} times in {CRASH_WINDOW:.0f}s, not restarting.")
+            self.failed = True
+            return
+        self.restarts += 1
+        metrics.increment("stt_worker_restarts")
+        self._start()
+
+    def _kill(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.join(timeout=5)
+        if self.conn is not None:
+            self.conn.close()
+
+    def _call(self, op, audio, prompt, empty):
+        audio = np.asarray(audio)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        with self.lock:
+            if self.failed:
+                return empty
+            try:
+                if not self.ready:
+                    self._wait_ready()
+                if len(audio) > len(self.buffer):
+                    self._allocate(int(len(audio) * 1.5))
+                self.buffer[:len(audio)] = audio
+                self.conn.send((op, self.shm.name, len(audio), prompt))
+                timeout = max(MIN_DECODE_TIMEOUT, DECODE_TIMEOUT_RTF * len(audio) / SAMPLE_RATE)
+                status, result = self._receive(timeout)
+            except (EOFError, OSError, TimeoutError, RuntimeError) as e:
+                self._restart(e)
+                return empty
+        if status != "ok":
+            print(f"STT worker error: {result}")
+            return empty
+        return result
+
+    def transcribe(self, audio_chunk, initial_prompt=None):
+        if audio_chunk is None or len(audio_chunk) == 0:
+            return ""
+        # Same span names as in-process decoding; these include the hand-off to the worker
+        with metrics.span("whisper_transcribe", audio_s=len(audio_chunk) / SAMPLE_RATE):
+            return self._call("transcribe", audio_chunk, initial_prompt, "")
+
+    def transcribe_words(self, audio_chunk, initial_prompt=None):
+        if audio_chunk is None or len(audio_chunk) == 0:
+            return []
+        with metrics.span("whisper_partial", audio_s=len(audio_chunk) / SAMPLE_RATE):
+            return self._call("words", audio_chunk, initial_prompt, [])
+
+    def close(self):
+        """Stop the worker and free the shared block."""
+        with self.lock:
+            if self.process is not None and self.process.is_alive():
+                try:
+                    self.conn.send(("stop", None, 0, None))
+                    self.process.join(timeout=2)
+                except (OSError, ValueError):
+                    pass
+            self._kill()
+            self.process = None
+            if self.shm is not None:
+                self.buffer = None
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = None
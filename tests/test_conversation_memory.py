@@ -0,0 +1,42 @@
+from conversation_memory import CONTEXT_TOKENS, ConversationMemory, estimate_tokens
+
+
+def long_answer(tokens):
+    return " ".join(f"word{i % 10}" for i in range(tokens * 4 // 6))
+
+
+def test_single_long_answer_stays_verbatim():
+    memory = ConversationMemory()
+    answer = long_answer(1000)
+    memory.add_exchange("How did you design the caching layer?", answer)
+
+    assert memory.stats()["turns"] == 2
+    assert memory.stats()["summarized_turns"] == 0
+    assert memory.summary == ""
+
+    context = memory.context()
+    assert "Interviewer: How did you design the caching layer?" in context
+    assert "You: " + answer[:200] in context
+    assert answer not in context
+    assert estimate_tokens(context) <= CONTEXT_TOKENS + 5
+
+
+def test_long_answer_folds_older_exchanges_only():
+    memory = ConversationMemory()
+    for i in range(3):
+        memory.add_exchange(f"Question number {i}?", f"Short answer {i}.")
+    memory.add_exchange("Tell me about your last project.", long_answer(1000))
+
+    assert memory.stats()["turns"] == 2
+    assert memory.stats()["summarized_turns"] == 6
+    context = memory.context()
+    assert "Question number 0" in context.split("Recent conversation:")[0]
+    assert "Interviewer: Tell me about your last project." in context
+
+
+def test_short_exchanges_kept_verbatim():
+    memory = ConversationMemory()
+    memory.add_exchange("What is your name?", "I am Sam.")
+    memory.add_turn("candidate", "Nice to meet you.")
+    assert memory.stats() == {"turns": 3, "summarized_turns": 0, "summary_tokens": 0}
+    assert memory.context().endswith("Interviewer: What is your name?\nYou: I am Sam.\nYou (said aloud): Nice to meet you.")
@@ -0,0 +1,34 @@
+import random
+
+from conversation_memory import estimate_tokens
+from profile_rag import CHUNK_TOKENS, RAG_TOKENS, HashEmbedder, ProfileRetriever, chunk_text
+
+SKILLS = ("python kubernetes terraform postgres kafka redis docker airflow spark grafana "
+          "microservices migration pipeline latency dashboard rollout").split()
+
+
+def unpunctuated(words, seed=0):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(SKILLS) for _ in range(words))
+
+
+def test_unpunctuated_text_is_split_within_chunk_budget():
+    chunks = chunk_text(unpunctuated(1000))
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= CHUNK_TOKENS for chunk in chunks)
+
+
+def test_unpunctuated_document_gives_context():
+    retriever = ProfileRetriever([("resume.pdf", unpunctuated(1000))], embedder=HashEmbedder())
+    assert retriever.search("kubernetes rollout")
+    context = retriever.context("kubernetes rollout")
+    assert context.startswith("Relevant background from your documents:")
+    assert estimate_tokens(context) <= RAG_TOKENS + 20
+
+
+def test_oversize_top_chunk_is_trimmed():
+    retriever = ProfileRetriever([("notes.txt", "kubernetes rollout plan")], embedder=HashEmbedder())
+    retriever.chunks[0]["text"] = "kubernetes rollout " * 600
+    context = retriever.context("kubernetes rollout")
+    assert "kubernetes rollout" in context
+    assert estimate_tokens(context) <= RAG_TOKENS + 20
@@ -0,0 +1,61 @@
+import pytest
+
+from response_cache import ResponseCache, question_key
+
+SAME_QUESTION = [
+    ("Can you tell me about yourself?", "So tell me about yourself."),
+    ("What are your strengths?", "Okay, what are your strengths?"),
+    ("Can you explain what Kubernetes is?", "What is Kubernetes?"),
+    ("What's the difference between a list and a tuple?", "What is the difference between lists and tuples?"),
+    ("Oh, hey, hi. Now tell me about yourselves.", "Tell me about yourself"),
+    ("What is the difference between a list and a tuple?", "Difference between list and tuple?"),
+    ("Difference between list and tuple?", "What is the difference between a list and a tuple?"),
+]
+
+DIFFERENT_QUESTION = [
+    ("What is the difference between a list and a tuple?", "What is the difference between a list and a set?"),
+    ("Why did you choose Java for this project?", "Why did you choose Python for this project?"),
+    ("How do you find the max of an array?", "How do you find the min of an array?"),
+    ("How do you reverse a linked list?", "How do you reverse a doubly linked list?"),
+    ("How do you convert a string to an int?", "How do you convert an int to a string?"),
+    ("What is a list?", "Why is a list?"),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache({"name": "test"}, "test.json", cache_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("first, second", SAME_QUESTION)
+def test_rewording_hits(cache, first, second):
+    cache.put(first, "answer")
+    assert cache.get(second) == "answer"
+
+
+@pytest.mark.parametrize("first, second", DIFFERENT_QUESTION)
+def test_differing_content_word_misses(cache, first, second):
+    assert question_key(first) != question_key(second)
+    cache.put(first, "answer")
+    assert cache.get(second) is None
+    assert cache.get(first) == "answer"
+
+
+def test_missing_question_word_ambiguous(cache):
+    cache.put("What is a closure?", "what answer")
+    cache.put("Why a closure?", "why answer")
+    assert cache.get("Closure?") is None
+    assert cache.get("Why a closure") == "why answer"
+
+
+def test_reloaded_from_disk(tmp_path):
+    ResponseCache({"name": "test"}, "test.json", cache_dir=str(tmp_path)).put("So tell me about yourself.", "answer")
+    reloaded = ResponseCache({"name": "test"}, "test.json", cache_dir=str(tmp_path))
+    assert reloaded.get("Can you tell me about yourself?") == "answer"
+    assert ResponseCache({"name": "other"}, "test.json", cache_dir=str(tmp_path)).get("So tell me about yourself.") is None
+
+
+def test_expired_entry_misses(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path), ttl=0)
+    cache.put("What are your strengths?", "answer")
+    assert cache.get("What are your strengths?") is None
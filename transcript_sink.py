@@ -0,0 +1,142 @@
+"""
+Background transcript writer.
+
+Q&A records are queued by the app and written by one background thread in
+batches, as JSON lines with timings:
+
+    {"time": "2025-11-28T14:03:12", "question": "...", "answer": "...",
+     "model": "gemini/gemini-flash-latest", "audio_s": 3.1, "stt_s": 0.42,
+     "llm_first_token_s": 0.61, "llm_total_s": 2.3, "speech_end_to_answer_s": 3.4, ...}
+
+The file is flushed after every batch and fsynced every fsync_interval seconds, so
+answering never waits on disk. The same records render to the human-readable .txt
+format the app has always written (see format_txt / jsonl_to_txt).
+
+Usage (convert a JSONL transcript to text):
+    python transcript_sink.py transcripts/Name_2025-11-28_transcript.jsonl [out.txt]
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+
+def format_txt(record):
+    """One Q&A record in the classic transcript layout."""
+    timestamp = record.get("time", "")[-8:] or time.strftime("%H:%M:%S")
+    return (f"[{timestamp}] Q: {record.get('question', '')}\n"
+            f"[{timestamp}] A: {record.get('answer', '')}\n"
+            + "-" * 40 + "\n")
+
+
+def read_jsonl(path):
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A torn last line after a crash; everything before it is intact
+                print(f"Skipping unreadable line in {path}")
+    return records
+
+
+def jsonl_to_txt(jsonl_path, txt_path=None, append=False):
+    """Render a JSONL transcript as .txt (next to it by default). Returns the .txt path."""
+    txt_path = txt_path or os.path.splitext(jsonl_path)[0] + ".txt"
+    records = read_jsonl(jsonl_path)
+    with open(txt_path, "a" if append else "w", encoding="utf-8") as f:
+        f.write("".join(format_txt(r) for r in records))
+    return txt_path
+
+
+class TranscriptSink:
+    """
+    Batched JSONL writer on its own thread. write() only enqueues.
+    close() drains the queue, fsyncs and optionally appends this session to a .txt.
+    on_flush(path) is called on the writer thread after each batch (e.g. SearchIndex.index_file).
+    """
+    def __init__(self, path, flush_interval=1.0, fsync_interval=5.0, max_batch=64, txt_path=None,
+                 on_flush=None):
+        self.path = path
+        self.txt_path = txt_path
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.session_records = []
+        self.closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._run, name="transcript-sink")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, record):
+        if not self.closed:
+            self.queue.put(record)
+
+    def _run(self):
+        last_fsync = time.monotonic()
+        dirty = False
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+                while len(batch) < self.max_batch:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            # None is the close() sentinel; write what came before it
+            if None in batch:
+                running = False
+                batch = [r for r in batch if r is not None]
+            try:
+                if batch:
+                    self.file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+                    self.file.flush()
+                    self.session_records.extend(batch)
+                    dirty = True
+                # Idle wake-ups (every flush_interval) also sync whatever is still pending
+                if dirty and (not running or time.monotonic() - last_fsync >= self.fsync_interval):
+                    os.fsync(self.file.fileno())
+                    last_fsync = time.monotonic()
+                    dirty = False
+            except Exception as e:
+                print(f"Failed to write transcript: {e}")
+                continue
+            if batch and self.on_flush:
+                try:
+                    self.on_flush(self.path)
+                except Exception as e:
+                    print(f"Failed to index transcript: {e}")
+
+    def close(self, timeout=5.0):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+        self.file.close()
+        if self.txt_path and self.session_records:
+            try:
+                with open(self.txt_path, "a", encoding="utf-8") as f:
+                    f.write("".join(format_txt(r) for r in self.session_records))
+                print(f"Transcript saved to: {self.txt_path}")
+            except Exception as e:
+                print(f"Failed to save text transcript: {e}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    print(f"Wrote {jsonl_to_txt(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)}")
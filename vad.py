@@ -0,0 +1,148 @@
+import collections
+import numpy as np
+
+# Frame events returned by UtteranceSegmenter.update()
+SPEECH_START = "start"
+SPEECH_END = "end"
+
+
+def frame_rms(frames):
+    """RMS of each frame. frames: 2-D array (n_frames, frame_len) or a single 1-D frame."""
+    frames = np.atleast_2d(frames)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+
+
+def split_frames(audio, frame_len):
+    """View 1-D audio as (n_frames, frame_len) without copying; a trailing partial frame is dropped."""
+    n_frames = len(audio) // frame_len
+    return audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+
+class EnergyVAD:
+    """
+    RMS energy VAD with an adaptive noise floor.
+
+    The floor is the minimum frame RMS over a sliding window (minimum statistics),
+    so it follows steady background noise on the loopback device without being
+    dragged up by speech. A frame is speech when its RMS is `ratio` times the floor.
+    """
+    def __init__(self, frame_duration=0.1, floor_window=5.0, ratio=3.0, min_threshold=0.005, initial_floor=0.01):
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.history_len = max(1, int(floor_window / frame_duration))
+        self.history = np.full(self.history_len, initial_floor, dtype=np.float32)
+
+    @property
+    def noise_floor(self):
+        return float(self.history.min())
+
+    def classify(self, frames):
+        """Return a boolean speech decision per frame (vectorized over the batch)."""
+        rms = frame_rms(frames).astype(np.float32)
+        # Floor for frame i is the minimum over the `history_len` frames before it
+        padded = np.concatenate([self.history, rms])
+        windows = np.lib.stride_tricks.sliding_window_view(padded[:-1], self.history_len)
+        floors = windows[-len(rms):].min(axis=1)
+        self.history = padded[-self.history_len:]
+        return rms > np.maximum(floors * self.ratio, self.min_threshold)
+
+
+class SileroVAD:
+    """
+    Neural VAD using the Silero model bundled with faster-whisper.
+
+    Each frame is judged together with a short window of preceding audio, since the
+    model needs some context to be reliable.
+    """
+    def __init__(self, sample_rate=16000, context=0.5, threshold=0.5):
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+        self._get_speech_timestamps = get_speech_timestamps
+        self.options = VadOptions(threshold=threshold, min_silence_duration_ms=100, speech_pad_ms=0)
+        self.context_len = max(1, int(context * sample_rate))
+        self.context = np.zeros(0, dtype=np.float32)
+
+    def classify(self, frames):
+        frames = np.atleast_2d(frames)
+        decisions = np.zeros(len(frames), dtype=bool)
+        for i, frame in enumerate(frames):
+            self.context = np.concatenate([self.context, frame.astype(np.float32)])[-self.context_len:]
+            frame_start = len(self.context) - len(frame)
+            segments = self._get_speech_timestamps(self.context, self.options)
+            decisions[i] = any(seg["end"] > frame_start for seg in segments)
+        return decisions
+
+
+def create_vad(name="energy", sample_rate=16000, frame_duration=0.1):
+    """Build a VAD by name ("energy" or "silero"). Silero falls back to energy if unavailable."""
+    if name == "silero":
+        try:
+            return SileroVAD(sample_rate=sample_rate)
+        except Exception as e:
+            print(f"Silero VAD unavailable ({e}), falling back to energy VAD.")
+    return EnergyVAD(frame_duration=frame_duration)
+
+
+class UtteranceSegmenter:
+    """
+    Turns per-frame speech decisions into utterance boundaries.
+
+    The end-of-utterance hangover adapts to the speaker: it tracks the pauses
+    they make inside utterances and waits a bit longer than their usual pause,
+    within [min_hangover, max_hangover], instead of a fixed 1.5 s.
+    """
+    def __init__(self, frame_duration=0.1, min_speech=0.2, initial_hangover=0.8,
+                 min_hangover=0.4, max_hangover=1.5, max_duration=30.0):
+        self.frame_duration = frame_duration
+        self.min_speech_frames = max(1, int(round(min_speech / frame_duration)))
+        self.min_hangover = min_hangover
+        self.max_hangover = max_hangover
+        self.hangover = initial_hangover
+        self.max_frames = int(max_duration / frame_duration)
+        self.pauses = collections.deque(maxlen=50)
+        # Silence (s) at the end of the last finished utterance, i.e. how late SPEECH_END fired
+        self.last_trailing_silence = 0.0
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+        self.utterance_frames = 0
+        self.forced = False
+
+    def update(self, is_speech):
+        """Advance one frame. Returns SPEECH_START, SPEECH_END or None."""
+        if not self.in_speech:
+            self.speech_run = self.speech_run + 1 if is_speech else 0
+            if self.speech_run >= self.min_speech_frames:
+                self.in_speech = True
+                self.forced = False
+                self.utterance_frames = self.speech_run
+                self.silence_run = 0
+                return SPEECH_START
+            return None
+
+        self.utterance_frames += 1
+        if is_speech:
+            if self.silence_run:
+                self._learn_pause(self.silence_run * self.frame_duration)
+            self.silence_run = 0
+        else:
+            self.silence_run += 1
+
+        if self.silence_run * self.frame_duration >= self.hangover:
+            self.last_trailing_silence = self.silence_run * self.frame_duration
+            self.reset()
+            return SPEECH_END
+        if self.utterance_frames >= self.max_frames:
+            self.last_trailing_silence = self.silence_run * self.frame_duration
+            self.reset()
+            self.forced = True
+            return SPEECH_END
+        return None
+
+    def _learn_pause(self, pause):
+        self.pauses.append(pause)
+        if len(self.pauses) >= 3:
+            typical = float(np.percentile(self.pauses, 90))
+            self.hangover = min(self.max_hangover, max(self.min_hangover, typical * 1.3 + self.frame_duration))